@@ -0,0 +1,56 @@
+# Limites do tamanho de página das buscas de PRs (a API aceita no máximo 100)
+MIN_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 100
+
+# Latência-alvo de uma página (segundos): acima dela a página diminui
+LATENCY_TARGET_SECONDS = 10
+
+# Quantos PRs a página cresce após uma resposta rápida
+GROW_STEP = 10
+
+# Respostas rápidas seguidas antes de voltar a testar um tamanho que já falhou
+PROBE_AFTER_PAGES = 20
+
+
+class AdaptivePageSize:
+    """
+    Tamanho de página adaptativo de uma paginação: cai pela metade quando uma
+    página falha (502/timeout), diminui um quarto quando passa da latência-alvo
+    e cresce aos poucos quando as páginas voltam rápidas.
+
+    O menor tamanho que falhou vira um teto, de modo que a paginação se
+    estabiliza logo abaixo dele em vez de alternar entre sucesso e falha; após
+    PROBE_AFTER_PAGES páginas rápidas seguidas o teto é descartado e o tamanho
+    maior é testado de novo.
+    """
+
+    def __init__(self, initial=MAX_PAGE_SIZE, minimum=MIN_PAGE_SIZE, maximum=MAX_PAGE_SIZE,
+                 latency_target=LATENCY_TARGET_SECONDS):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.size = max(minimum, min(maximum, initial))
+        self.ceiling = None
+        self._fast_pages = 0
+
+    def record_failure(self):
+        self.ceiling = self.size if self.ceiling is None else min(self.ceiling, self.size)
+        self.size = max(self.minimum, self.size // 2)
+        self._fast_pages = 0
+
+    def record_success(self, seconds):
+        if seconds > self.latency_target:
+            self.ceiling = self.size if self.ceiling is None else min(self.ceiling, self.size)
+            self.size = max(self.minimum, self.size * 3 // 4)
+            self._fast_pages = 0
+            return
+        if seconds > self.latency_target / 2:
+            self._fast_pages = 0
+            return
+
+        self._fast_pages += 1
+        if self.ceiling is not None and self._fast_pages >= PROBE_AFTER_PAGES:
+            self.ceiling = None
+            self._fast_pages = 0
+        limit = self.maximum if self.ceiling is None else max(self.minimum, self.ceiling - 1)
+        self.size = min(limit, self.size + GROW_STEP)
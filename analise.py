@@ -2,21 +2,18 @@ import pandas as pd
 import numpy as np
 import seaborn as sns
 import matplotlib.pyplot as plt
-from scipy import stats
 from scipy.stats import spearmanr
-import json
+from pr_dataset import load_prepared_dataframe
+from correlation import rank_cache_for
+from figure_pool import figure_pool
 
 # Carregar dados
-with open('dados_pull_requests3.json', 'r', encoding='utf-8') as file:
-  dados_json = json.load(file)
+df = load_prepared_dataframe()  # Já com as colunas derivadas, em cache (ver pr_dataset.py)
 
-df = pd.DataFrame(dados_json)
-
-# Preparar dados
-df['data_criacao'] = pd.to_datetime(df['data_criacao'])
-df['data_fechamento'] = pd.to_datetime(df['data_fechamento'])
-df['tamanho_total_linhas'] = df['linhas_adicionadas'] + df['linhas_removidas']
-df['estado_numerico'] = (df['estado'] == 'MERGED').astype(int)
+# Ranks das colunas calculados uma vez e reaproveitados pelos testes e correlações (ver correlation.py)
+ranks_df = rank_cache_for(df)
+merged_mask = (df['estado'] == 'MERGED').to_numpy()
+closed_mask = (df['estado'] == 'CLOSED').to_numpy()
 
 # Configurações
 plt.style.use('seaborn-v0_8-darkgrid')
@@ -149,10 +146,7 @@ ax1.set_ylabel('Tamanho Total (linhas, log)', fontsize=11)
 # Adicionar estatísticas
 merged_median = df[df['estado'] == 'MERGED']['tamanho_total_linhas'].median()
 closed_median = df[df['estado'] == 'CLOSED']['tamanho_total_linhas'].median()
-u_stat, p_val = stats.mannwhitneyu(
-  df[df['estado'] == 'MERGED']['tamanho_total_linhas'],
-  df[df['estado'] == 'CLOSED']['tamanho_total_linhas']
-)
+u_stat, p_val = ranks_df.mann_whitney('tamanho_total_linhas', merged_mask, closed_mask)
 ax1.text(0.5, 0.98, f'Mann-Whitney U: p={p_val:.4f}\nMERGED: {merged_median:.0f} | CLOSED: {closed_median:.0f}',
        transform=ax1.transAxes, ha='center', va='top', fontsize=9,
        bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.8))
@@ -214,10 +208,7 @@ ax4.set_ylabel('Tempo de Análise (dias, log)', fontsize=11)
 
 merged_median = df[df['estado'] == 'MERGED']['tempo_analise_dias'].median()
 closed_median = df[df['estado'] == 'CLOSED']['tempo_analise_dias'].median()
-u_stat, p_val = stats.mannwhitneyu(
-  df[df['estado'] == 'MERGED']['tempo_analise_dias'],
-  df[df['estado'] == 'CLOSED']['tempo_analise_dias']
-)
+u_stat, p_val = ranks_df.mann_whitney('tempo_analise_dias', merged_mask, closed_mask)
 ax4.text(0.5, 0.98, f'Mann-Whitney U: p={p_val:.4f}\nMERGED: {merged_median:.1f}d | CLOSED: {closed_median:.1f}d',
        transform=ax4.transAxes, ha='center', va='top', fontsize=9,
        bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.8))
@@ -287,10 +278,7 @@ ax7.set_ylabel('Descrição (caracteres, log)', fontsize=11)
 
 merged_median = df[df['estado'] == 'MERGED']['tamanho_descricao_caracteres'].median()
 closed_median = df[df['estado'] == 'CLOSED']['tamanho_descricao_caracteres'].median()
-u_stat, p_val = stats.mannwhitneyu(
-  df[df['estado'] == 'MERGED']['tamanho_descricao_caracteres'],
-  df[df['estado'] == 'CLOSED']['tamanho_descricao_caracteres']
-)
+u_stat, p_val = ranks_df.mann_whitney('tamanho_descricao_caracteres', merged_mask, closed_mask)
 ax7.text(0.5, 0.98, f'Mann-Whitney U: p={p_val:.4f}\nMERGED: {merged_median:.0f} | CLOSED: {closed_median:.0f}',
        transform=ax7.transAxes, ha='center', va='top', fontsize=9,
        bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.8))
@@ -374,10 +362,7 @@ ax10.legend()
 ax10.grid(True, alpha=0.3, axis='y')
 
 # Teste estatístico
-u_stat, p_val = stats.mannwhitneyu(
-  df[df['estado'] == 'MERGED']['num_participantes'],
-  df[df['estado'] == 'CLOSED']['num_participantes']
-)
+u_stat, p_val = ranks_df.mann_whitney('num_participantes', merged_mask, closed_mask)
 ax10.text(0.98, 0.98, f'Mann-Whitney U\np={p_val:.4f}',
         transform=ax10.transAxes, ha='right', va='top', fontsize=9,
         bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.8))
@@ -408,10 +393,7 @@ ax11.set_xticklabels([str(x) for x in all_faixas], rotation=45, ha='right', font
 ax11.legend()
 ax11.grid(True, alpha=0.3, axis='y')
 
-u_stat, p_val = stats.mannwhitneyu(
-  df[df['estado'] == 'MERGED']['num_comentarios'],
-  df[df['estado'] == 'CLOSED']['num_comentarios']
-)
+u_stat, p_val = ranks_df.mann_whitney('num_comentarios', merged_mask, closed_mask)
 ax11.text(0.98, 0.98, f'Mann-Whitney U\np={p_val:.4f}',
         transform=ax11.transAxes, ha='right', va='top', fontsize=9,
         bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.8))
@@ -448,9 +430,7 @@ for i, bar in enumerate(bars):
             ha='center', va='bottom', fontsize=8)
 
 plt.tight_layout()
-plt.savefig('09_DIMENSAO_A_completa.png', dpi=300, bbox_inches='tight')
-print("✓ Salvo: 09_DIMENSAO_A_completa.png")
-plt.close()
+figure_pool.save(fig, '09_DIMENSAO_A_completa.png')  # PNG renderizado em paralelo (ver figure_pool.py)
 
 # ============================================
 # GRÁFICOS ESPECÍFICOS PARA DIMENSÃO B
@@ -779,9 +759,7 @@ ax12.set_ylabel('Quintil de Participantes', fontsize=11)
 ax12.set_title('RQ08: Revisões Médias por Interações Combinadas', fontweight='bold', fontsize=12)
 
 plt.tight_layout()
-plt.savefig('10_DIMENSAO_B_completa.png', dpi=300, bbox_inches='tight')
-print("✓ Salvo: 10_DIMENSAO_B_completa.png")
-plt.close()
+figure_pool.save(fig, '10_DIMENSAO_B_completa.png')
 
 # ============================================
 # GRÁFICO RESUMO: PANORAMA GERAL DAS RQs
@@ -813,7 +791,7 @@ for rq, (var1, var2) in rqs.items():
   if 'score_interacao' in [var1, var2] and 'score_interacao' not in df.columns:
       df['score_interacao'] = (df['num_participantes'] + df['num_comentarios']) / 2
   
-  rho, p_val = spearmanr(df[var1], df[var2])
+  rho, p_val = ranks_df.spearman(var1, var2)
   correlacoes.append(rho)
   p_values.append(p_val)
   significancias.append('***' if p_val < 0.001 else '**' if p_val < 0.01 else '*' if p_val < 0.05 else 'ns')
@@ -919,9 +897,10 @@ for idx, var_x, var_y, titulo, color in scatter_configs:
           bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.8))
 
 plt.tight_layout()
-plt.savefig('11_PANORAMA_GERAL_RQs.png', dpi=300, bbox_inches='tight')
-print("✓ Salvo: 11_PANORAMA_GERAL_RQs.png")
-plt.close()
+figure_pool.save(fig, '11_PANORAMA_GERAL_RQs.png')
+
+# Espera os PNGs que ainda estão sendo renderizados pelo pool
+figure_pool.wait()
 
 # ============================================
 # RELATÓRIO FINAL
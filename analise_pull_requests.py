@@ -3,10 +3,12 @@ import numpy as np
 import seaborn as sns
 import matplotlib.pyplot as plt
 from scipy import stats
-from scipy.stats import spearmanr, pearsonr
 from sklearn.linear_model import LinearRegression
 from sklearn.metrics import r2_score, mean_squared_error
-import json
+from page_normalizer import PR_FIELDS
+from pr_dataset import load_prepared_dataframe
+from correlation import analise_correlacao_completa, rank_cache_for, spearman_matrix
+from figure_pool import figure_pool
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -27,52 +29,41 @@ print("="*80)
 
 print("\n📂 Carregando dados de: dados_pull_requests3.json")
 
-with open('dados_pull_requests3.json', 'r', encoding='utf-8') as file:
- dados_json = json.load(file)
+df = load_prepared_dataframe()  # Já com as colunas derivadas, em cache (ver pr_dataset.py)
 
-df = pd.DataFrame(dados_json)
+# Ranks das colunas calculados uma vez e reaproveitados por todas as correlações
+# e testes de Mann-Whitney abaixo (ver correlation.py)
+ranks_df = rank_cache_for(df)
+merged_mask = (df['estado'] == 'MERGED').to_numpy()
+closed_mask = (df['estado'] == 'CLOSED').to_numpy()
+
+# Colunas da coleta, sem as derivadas: a visão geral abaixo descreve o dataset original
+df_original = df[[col for col in PR_FIELDS if col in df.columns]]
 
 print(f"✓ Dados carregados com sucesso!")
 print(f"✓ Total de registros: {len(df):,}")
-print(f"✓ Total de colunas: {len(df.columns)}")
+print(f"✓ Total de colunas: {len(df_original.columns)}")
 
 print("\n" + "="*80)
 print("INFORMAÇÕES DO DATASET")
 print("="*80)
-print(df.info())
+print(df_original.info())
 
 print("\n" + "="*80)
 print("PRIMEIRAS LINHAS DO DATASET")
 print("="*80)
-print(df.head())
+print(df_original.head())
 
 print("\n" + "="*80)
 print("VALORES AUSENTES")
 print("="*80)
-missing = df.isnull().sum()
+missing = df_original.isnull().sum()
 if missing.sum() > 0:
  print(missing[missing > 0])
  print(f"\n⚠️  Total de valores ausentes: {missing.sum()}")
 else:
  print("✓ Não há valores ausentes no dataset!")
 
-# Converter datas
-df['data_criacao'] = pd.to_datetime(df['data_criacao'])
-df['data_fechamento'] = pd.to_datetime(df['data_fechamento'])
-
-# Criar variáveis derivadas
-df['tamanho_total_linhas'] = df['linhas_adicionadas'] + df['linhas_removidas']
-df['estado_numerico'] = (df['estado'] == 'MERGED').astype(int)
-df['ano'] = df['data_criacao'].dt.year
-df['mes'] = df['data_criacao'].dt.month
-df['ano_mes'] = df['data_criacao'].dt.to_period('M')
-
-# Adicionar +1 para permitir log (evitar log(0))
-df['tamanho_total_linhas_log'] = np.log1p(df['tamanho_total_linhas'])
-df['tempo_analise_dias_log'] = np.log1p(df['tempo_analise_dias'])
-df['num_comentarios_log'] = np.log1p(df['num_comentarios'])
-df['num_revisoes_log'] = np.log1p(df['num_revisoes'])
-
 print("\n" + "="*80)
 print("ESTATÍSTICAS DESCRITIVAS")
 print("="*80)
@@ -209,9 +200,7 @@ for idx, (var, titulo, cor) in enumerate(variaveis_plot):
          facecolor='wheat', alpha=0.7))
 
 plt.tight_layout()
-plt.savefig('01_distribuicoes_log.png', dpi=300, bbox_inches='tight')
-print("✓ Salvo: 01_distribuicoes_log.png")
-plt.close()
+figure_pool.save(fig, '01_distribuicoes_log.png')  # PNG renderizado em paralelo (ver figure_pool.py)
 
 # ============================================
 # GRÁFICO 2: COMPARAÇÃO MERGED vs CLOSED (ESCALA LOG)
@@ -254,7 +243,7 @@ for idx, (var, titulo) in enumerate(variaveis_comparacao):
  merged = df[df['estado'] == 'MERGED'][var]
  closed = df[df['estado'] == 'CLOSED'][var]
  
- u_stat, p_val = stats.mannwhitneyu(merged, closed, alternative='two-sided')
+ u_stat, p_val = ranks_df.mann_whitney(var, merged_mask, closed_mask)
  z_score = abs(stats.norm.ppf(p_val / 2))
  effect_size = z_score / np.sqrt(len(df))
  
@@ -290,9 +279,7 @@ for idx, (var, titulo) in enumerate(variaveis_comparacao):
          bbox=dict(boxstyle='round', facecolor='lightyellow', alpha=0.8))
 
 plt.tight_layout()
-plt.savefig('02_merged_vs_closed_log.png', dpi=300, bbox_inches='tight')
-print("✓ Salvo: 02_merged_vs_closed_log.png")
-plt.close()
+figure_pool.save(fig, '02_merged_vs_closed_log.png')
 
 # ============================================
 # GRÁFICO 3: SÉRIES TEMPORAIS
@@ -354,9 +341,7 @@ ax.grid(True, alpha=0.3)
 ax.tick_params(axis='x', rotation=45)
 
 plt.tight_layout()
-plt.savefig('03_series_temporais.png', dpi=300, bbox_inches='tight')
-print("✓ Salvo: 03_series_temporais.png")
-plt.close()
+figure_pool.save(fig, '03_series_temporais.png')
 
 # ============================================
 # GRÁFICO 4: SCATTERPLOT MATRIX (CORRELAÇÕES VISUAIS)
@@ -389,18 +374,8 @@ rename_dict = {
 df_corr = df[variaveis_correlacao].copy()
 df_corr.columns = [rename_dict[col] for col in df_corr.columns]
 
-correlacao_spearman = df_corr.corr(method='spearman')
-
-# Calcular p-values
-p_values = pd.DataFrame(np.zeros_like(correlacao_spearman), 
-                    columns=correlacao_spearman.columns,
-                    index=correlacao_spearman.index)
-
-for i, col1 in enumerate(df_corr.columns):
- for j, col2 in enumerate(df_corr.columns):
-     if i != j:
-         _, p_val = spearmanr(df_corr[col1], df_corr[col2])
-         p_values.iloc[i, j] = p_val
+# ρ e p-values de todos os pares numa passada (cada coluna ordenada uma vez)
+correlacao_spearman, p_values = spearman_matrix(df_corr)
 
 fig, ax = plt.subplots(figsize=(16, 14))
 mask = np.triu(np.ones_like(correlacao_spearman, dtype=bool))
@@ -414,9 +389,7 @@ sns.heatmap(correlacao_spearman, mask=mask, annot=True, fmt='.3f',
 plt.title('Matriz de Correlação de Spearman\n(Valores mais fortes em cores intensas)', 
        fontsize=18, fontweight='bold', pad=20)
 plt.tight_layout()
-plt.savefig('04_correlacao_spearman.png', dpi=300, bbox_inches='tight')
-print("✓ Salvo: 04_correlacao_spearman.png")
-plt.close()
+figure_pool.save(fig, '04_correlacao_spearman.png')
 
 # Exibir correlações fortes
 print("\n" + "="*80)
@@ -501,7 +474,7 @@ for idx, (var, titulo, cor) in enumerate(preditores_revisoes):
  
  # Métricas
  r2 = r2_score(y, y_pred)
- rho, p_spearman = spearmanr(df[var], df['num_revisoes'])
+ rho, p_spearman = ranks_df.spearman(var, 'num_revisoes')
  
  resultados_regressao_revisoes[var] = {
      'coef': model.coef_[0],
@@ -521,9 +494,7 @@ for idx, (var, titulo, cor) in enumerate(preditores_revisoes):
  ax.grid(True, alpha=0.3, which='both', linestyle='--')
 
 plt.tight_layout()
-plt.savefig('05_regressao_revisoes_log.png', dpi=300, bbox_inches='tight')
-print("✓ Salvo: 05_regressao_revisoes_log.png")
-plt.close()
+figure_pool.save(fig, '05_regressao_revisoes_log.png')
 
 # ============================================
 # GRÁFICO 6: COMPARATIVO DE DENSIDADES
@@ -570,9 +541,7 @@ for idx, (var, titulo) in enumerate(variaveis_densidade):
             linewidth=2, alpha=0.6)
 
 plt.tight_layout()
-plt.savefig('06_densidades_comparativas.png', dpi=300, bbox_inches='tight')
-print("✓ Salvo: 06_densidades_comparativas.png")
-plt.close()
+figure_pool.save(fig, '06_densidades_comparativas.png')
 
 # ============================================
 # GRÁFICO 7: ANÁLISE DE OUTLIERS E QUANTIS
@@ -654,9 +623,7 @@ ax.set_title('Boxplot: Número de Revisões', fontweight='bold', fontsize=14)
 ax.grid(True, alpha=0.3, axis='y')
 
 plt.tight_layout()
-plt.savefig('07_analise_quantis.png', dpi=300, bbox_inches='tight')
-print("✓ Salvo: 07_analise_quantis.png")
-plt.close()
+figure_pool.save(fig, '07_analise_quantis.png')
 
 # ============================================
 # GRÁFICO 8: HEATMAP DE MÉTRICAS POR CATEGORIA
@@ -702,58 +669,13 @@ ax.set_title('Diferença Percentual (MERGED vs CLOSED)', fontweight='bold', font
 ax.set_xlabel('Métricas', fontsize=12)
 
 plt.tight_layout()
-plt.savefig('08_heatmap_comparativo.png', dpi=300, bbox_inches='tight')
-print("✓ Salvo: 08_heatmap_comparativo.png")
-plt.close()
+figure_pool.save(fig, '08_heatmap_comparativo.png')
 
 # ============================================
 # CONTINUAR COM AS ANÁLISES DAS RQs...
 # ============================================
 
-def analise_correlacao_completa(var1_name, var2_name, dados):
- var1 = dados[var1_name]
- var2 = dados[var2_name]
- 
- rho, p_spearman = spearmanr(var1, var2)
- r, p_pearson = pearsonr(var1, var2)
- 
- abs_rho = abs(rho)
- if abs_rho < 0.1:
-     forca = "Trivial"
- elif abs_rho < 0.3:
-     forca = "Fraca"
- elif abs_rho < 0.5:
-     forca = "Moderada"
- elif abs_rho < 0.7:
-     forca = "Forte"
- else:
-     forca = "Muito Forte"
- 
- direcao = "Positiva" if rho > 0 else "Negativa"
- 
- if p_spearman < 0.001:
-     sig = "***"
-     sig_text = "Altamente significativa"
- elif p_spearman < 0.01:
-     sig = "**"
-     sig_text = "Muito significativa"
- elif p_spearman < 0.05:
-     sig = "*"
-     sig_text = "Significativa"
- else:
-     sig = "ns"
-     sig_text = "Não significativa"
- 
- return {
-     'spearman_rho': rho,
-     'spearman_p': p_spearman,
-     'pearson_r': r,
-     'pearson_p': p_pearson,
-     'forca': forca,
-     'direcao': direcao,
-     'significancia': sig,
-     'sig_text': sig_text
- }
+# (analise_correlacao_completa vem de correlation.py, compartilhada com relatorio.py)
 
 # ============================================
 # RESPOSTAS ÀS QUESTÕES DE PESQUISA
@@ -787,7 +709,7 @@ print(f"\n🔹 Estatísticas Descritivas:")
 print(f"   MERGED: Mediana = {merged_tamanho.median():.0f} | Média = {merged_tamanho.mean():.0f} | DP = {merged_tamanho.std():.0f}")
 print(f"   CLOSED: Mediana = {closed_tamanho.median():.0f} | Média = {closed_tamanho.mean():.0f} | DP = {closed_tamanho.std():.0f}")
 
-u_stat, p_val = stats.mannwhitneyu(merged_tamanho, closed_tamanho, alternative='two-sided')
+u_stat, p_val = ranks_df.mann_whitney('tamanho_total_linhas', merged_mask, closed_mask)
 print(f"\n🔹 Teste Mann-Whitney U: U = {u_stat:,.0f}, p = {p_val:.4f}")
 
 z_score = abs(stats.norm.ppf(p_val / 2)) if p_val > 0 else 0
@@ -837,7 +759,7 @@ print(f"\n🔹 Estatísticas Descritivas:")
 print(f" MERGED: Mediana = {merged_tempo.median():.1f} dias | Média = {merged_tempo.mean():.1f} | DP = {merged_tempo.std():.1f}")
 print(f" CLOSED: Mediana = {closed_tempo.median():.1f} dias | Média = {closed_tempo.mean():.1f} | DP = {closed_tempo.std():.1f}")
 
-u_stat, p_val = stats.mannwhitneyu(merged_tempo, closed_tempo, alternative='two-sided')
+u_stat, p_val = ranks_df.mann_whitney('tempo_analise_dias', merged_mask, closed_mask)
 print(f"\n🔹 Teste Mann-Whitney U: U = {u_stat:,.0f}, p = {p_val:.4f}")
 
 z_score = abs(stats.norm.ppf(p_val / 2))
@@ -880,7 +802,7 @@ print(f"\n🔹 Estatísticas Descritivas:")
 print(f" MERGED: Mediana = {merged_desc.median():.0f} caracteres | Média = {merged_desc.mean():.0f} | DP = {merged_desc.std():.0f}")
 print(f" CLOSED: Mediana = {closed_desc.median():.0f} caracteres | Média = {closed_desc.mean():.0f} | DP = {closed_desc.std():.0f}")
 
-u_stat, p_val = stats.mannwhitneyu(merged_desc, closed_desc, alternative='two-sided')
+u_stat, p_val = ranks_df.mann_whitney('tamanho_descricao_caracteres', merged_mask, closed_mask)
 print(f"\n🔹 Teste Mann-Whitney U: U = {u_stat:,.0f}, p = {p_val:.4f}")
 
 z_score = abs(stats.norm.ppf(p_val / 2))
@@ -929,7 +851,7 @@ closed_part = df[df['estado'] == 'CLOSED']['num_participantes']
 
 print(f" MERGED: Mediana = {merged_part.median():.1f} | CLOSED: Mediana = {closed_part.median():.1f}")
 
-u_stat, p_val = stats.mannwhitneyu(merged_part, closed_part)
+u_stat, p_val = ranks_df.mann_whitney('num_participantes', merged_mask, closed_mask)
 if p_val < 0.05:
     if merged_part.median() > closed_part.median():
         print(f" ✓ PRs MERGED têm MAIS participantes (p = {p_val:.4f})")
@@ -952,7 +874,7 @@ closed_com = df[df['estado'] == 'CLOSED']['num_comentarios']
 
 print(f" MERGED: Mediana = {merged_com.median():.1f} | CLOSED: Mediana = {closed_com.median():.1f}")
 
-u_stat, p_val = stats.mannwhitneyu(merged_com, closed_com)
+u_stat, p_val = ranks_df.mann_whitney('num_comentarios', merged_mask, closed_mask)
 if p_val < 0.05:
     if merged_com.median() > closed_com.median():
         print(f" ✓ PRs MERGED têm MAIS comentários (p = {p_val:.4f})")
@@ -1173,4 +1095,7 @@ stats_por_grupo = pd.DataFrame({
 stats_por_grupo.to_csv('estatisticas_por_grupo.csv', index=False)
 print("✓ Salvo: estatisticas_por_grupo.csv")
 
+# Espera os PNGs que ainda estão sendo renderizados pelo pool
+figure_pool.wait()
+
 print("\n✅ Todos os arquivos foram gerados com sucesso!")
\ No newline at end of file
@@ -0,0 +1,181 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+import getRepos
+import getRepos2
+import getReposDetails
+from github_client import GraphQLClient, RetryPolicy
+from github_stub import GitHubStub, generate_repositories, load_fixture
+from graphql_batch import chunked
+from jsonl_sink import read_jsonl
+from rate_limit import RateLimitScheduler
+
+COLLECTOR_MODULES = (getRepos, getRepos2, getReposDetails)
+
+
+# --- MODOS DE COLETA ---
+# Cada modo roda um coletor inteiro contra o servidor local e devolve
+# (quantidade de itens coletados, unidade dos itens).
+
+def _repo_list(repos):
+    return [{"nameWithOwner": name} for name in repos]
+
+
+def discovery_per_repository(repos):
+    return len(getRepos2.fetch_process_and_filter()), "repos"
+
+
+def discovery_from_search(repos):
+    return len(getRepos2.fetch_and_filter_from_search()), "repos"
+
+
+def _count_repo_details_prs(path):
+    if not os.path.exists(path):
+        return 0
+    return sum(len(repo["pullRequests"]["nodes"]) for repo in read_jsonl(path))
+
+
+def repository_details_single(repos):
+    for repo in _repo_list(repos):
+        getRepos.fetch_repo_details_and_append_line(repo, output_filename="repo_details.json")
+    return _count_repo_details_prs("repo_details.json"), "PRs"
+
+
+def repository_details_batched(repos):
+    for repo_batch in chunked(_repo_list(repos), 10):
+        getRepos.fetch_repo_details_batch_and_append_lines(repo_batch, output_filename="repo_details.json")
+    return _count_repo_details_prs("repo_details.json"), "PRs"
+
+
+def pull_request_details(*cli_args):
+    def run(repos):
+        with open(getReposDetails.INPUT_JSON_FILE, "w", encoding="utf-8") as f:
+            json.dump(_repo_list(repos), f)
+        sys.argv = ["getReposDetails.py", *cli_args]
+        getReposDetails.main()
+        if "jsonl" in cli_args:
+            return sum(1 for _ in read_jsonl(getReposDetails.OUTPUT_JSONL_FILE)), "PRs"
+        with open(getReposDetails.OUTPUT_JSON_FILE, "r", encoding="utf-8") as f:
+            return len(json.load(f)), "PRs"
+    return run
+
+
+MODES = {
+    "descoberta-por-repositorio": discovery_per_repository,
+    "descoberta-busca": discovery_from_search,
+    "repositorio-individual": repository_details_single,
+    "repositorio-lote": repository_details_batched,
+    "detalhes-sequencial": pull_request_details(),
+    "detalhes-assincrono": pull_request_details("--concorrencia", "8"),
+    "detalhes-lote": pull_request_details("--concorrencia", "8", "--lote", "10"),
+    "detalhes-particionado": pull_request_details("--concorrencia", "8", "--particionar"),
+    "detalhes-jsonl": pull_request_details("--concorrencia", "8", "--formato", "jsonl"),
+}
+
+
+def run_mode(name, repos, stub_options):
+    """Roda um modo num diretório temporário, com servidor e cliente novos, e mede o resultado."""
+    stub = GitHubStub(repos, **stub_options)
+    url = stub.start()
+    client = GraphQLClient("benchmark", url=url, scheduler=RateLimitScheduler(),
+                           retry_policy=RetryPolicy(max_attempts=None, base_wait=1), tokens=[])
+    for module in COLLECTOR_MODULES:
+        module.client = client
+
+    previous_dir, previous_argv = os.getcwd(), sys.argv
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                items, unit = MODES[name](repos)
+            elapsed = time.perf_counter() - start
+        finally:
+            os.chdir(previous_dir)
+            sys.argv = previous_argv
+            stub.stop()
+            # Lidas antes de fechar a sessão, que descarta o pool de conexões
+            latency = client.latency_stats()
+            client.close()
+
+    return {
+        "modo": name,
+        "itens": items,
+        "unidade": unit,
+        "segundos": elapsed,
+        "itens_por_s": items / elapsed if elapsed else 0.0,
+        "requisicoes": stub.stats["requests"],
+        "requisicoes_por_s": stub.stats["requests"] / elapsed if elapsed else 0.0,
+        "falhas_502": stub.stats["502"],
+        "falhas_403": stub.stats["403"],
+        "conexoes": latency["connections_opened"],
+        "primeira_ms": latency.get("first_s", 0.0) * 1000,
+        "p50_ms": latency.get("p50_s", 0.0) * 1000,
+        "p95_ms": latency.get("p95_s", 0.0) * 1000,
+        "p99_ms": latency.get("p99_s", 0.0) * 1000,
+        "max_ms": latency.get("max_s", 0.0) * 1000,
+    }
+
+
+def print_report(results):
+    header = (f"{'modo':<28}{'itens':>8}{'itens/s':>11}{'req':>7}{'req/s':>9}{'conex':>7}{'1ª ms':>9}"
+              f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        # Conexões abertas (só HTTP/1.1): bem abaixo de `req` indica reaproveitamento pelo keep-alive
+        connections = "-" if r['conexoes'] is None else r['conexoes']
+        print(f"{r['modo']:<28}{r['itens']:>5} {r['unidade']:<5}{r['itens_por_s']:>8.1f}{r['requisicoes']:>7}"
+              f"{r['requisicoes_por_s']:>9.1f}{connections:>7}{r['primeira_ms']:>9.1f}"
+              f"{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['max_ms']:>9.1f}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Mede os modos de coleta contra o servidor local (github_stub.py), sem gastar a cota real.")
+    parser.add_argument("--modos", nargs="+", choices=list(MODES), default=list(MODES),
+                        help="Modos a medir (padrão: todos).")
+    parser.add_argument("--fixture", help="Arquivo gravado usado como dados (padrão: dados gerados).")
+    parser.add_argument("--repositorios", type=int, default=20, help="Repositórios gerados.")
+    parser.add_argument("--prs", type=int, default=300, help="PRs gerados por repositório.")
+    parser.add_argument("--latencia-ms", type=float, default=20, help="Latência média do servidor.")
+    parser.add_argument("--variacao-ms", type=float, default=10, help="Variação (±) da latência.")
+    parser.add_argument("--taxa-502", type=float, default=0.0,
+                        help="Fração de respostas 502 (as esperas de retentativa dos coletores entram na medição).")
+    parser.add_argument("--taxa-403", type=float, default=0.0, help="Fração de respostas 403 de limite secundário.")
+    parser.add_argument("--pagina-maxima", type=int, help="Buscas de PRs com `first` acima disto recebem 502.")
+    parser.add_argument("--latencia-por-pr-ms", type=float, default=0, help="Latência extra por PR devolvido.")
+    parser.add_argument("--saida", help="Grava os resultados também neste arquivo JSON.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    repos = load_fixture(args.fixture) if args.fixture else generate_repositories(args.repositorios, args.prs)
+    stub_options = {
+        "latency_ms": args.latencia_ms, "jitter_ms": args.variacao_ms,
+        "error_502_rate": args.taxa_502, "error_403_rate": args.taxa_403,
+        "max_page_size": args.pagina_maxima, "latency_per_node_ms": args.latencia_por_pr_ms,
+    }
+
+    results = []
+    for name in args.modos:
+        print(f"Medindo '{name}'...", flush=True)
+        results.append(run_mode(name, repos, stub_options))
+
+    print()
+    print_report(results)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\nResultados salvos em '{args.saida}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+import json
+import os
+import threading
+from collections import defaultdict
+
+
+def _write_json_atomically(path, data):
+    """Grava `data` num arquivo temporário e o renomeia, para nunca deixar um JSON truncado."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class CollectionCheckpoint:
+    """
+    Ponto de retomada da extração de PRs.
+
+    A coleta é dividida em unidades identificadas por uma chave: um repositório
+    inteiro ou uma janela de datas de um repositório. Após cada página, os
+    registros novos são anexados (com fsync) a um arquivo JSON Lines, cada
+    linha no formato {'chave': ..., 'pr': registro}, e o estado é regravado
+    atomicamente com:
+      - finished:    chave -> quantidade de registros (unidades concluídas)
+      - in_progress: chave -> {'cursor': endCursor, 'prs': quantidade}
+      - plan:        unidades planejadas no início da coleta (ver `save_plan`)
+
+    O estado é a fonte da verdade: registros anexados sem que o estado tenha
+    sido atualizado (queda entre as duas escritas) são descartados ao retomar.
+
+    Com uma saída JSON Lines ativa (ver `start_sink`), os registros não são
+    duplicados no arquivo do checkpoint: cada página vai só para a saída e o
+    estado guarda, em 'sink', o tamanho confirmado dela em bytes. Ao retomar,
+    a saída é truncada nesse tamanho (`truncate_sink`).
+    """
+
+    def __init__(self, state_path, records_path):
+        self.state_path = state_path
+        self.records_path = records_path
+        self.finished = {}
+        self.in_progress = {}
+        self.plan = None
+        self.sink = None        # {'start': bytes anteriores à coleta, 'offset': bytes confirmados}
+        self.records = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def reset(self):
+        """Começa uma coleta nova, descartando qualquer checkpoint anterior."""
+        with self._lock:
+            self.finished, self.in_progress = {}, {}
+            self.plan = None
+            self.sink = None
+            self.records = defaultdict(list)
+            open(self.records_path, 'w', encoding='utf-8').close()
+            _write_json_atomically(self.state_path, self._state())
+
+    def load(self):
+        """
+        Carrega o checkpoint existente e reescreve o arquivo de registros só com
+        os registros confirmados pelo estado. Se a coleta gravava numa saída
+        JSON Lines, o arquivo de registros não é lido: os registros já estão
+        na saída.
+
+        Returns:
+            bool: True se havia um checkpoint para retomar.
+        """
+        if not os.path.exists(self.state_path):
+            self.reset()
+            return False
+
+        with open(self.state_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        self.finished = state.get('finished', {})
+        self.in_progress = state.get('in_progress', {})
+        self.plan = state.get('plan')
+        self.sink = state.get('sink')
+
+        self.records = defaultdict(list)
+        if self.sink is not None:
+            return True
+
+        expected = dict(self.finished)
+        expected.update({key: info['prs'] for key, info in self.in_progress.items()})
+
+        if os.path.exists(self.records_path):
+            with open(self.records_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        break  # Última linha incompleta: escrita interrompida
+                    key = entry['chave']
+                    if len(self.records[key]) < expected.get(key, 0):
+                        self.records[key].append(entry['pr'])
+
+        with open(f"{self.records_path}.tmp", 'w', encoding='utf-8') as f:
+            for key, key_records in self.records.items():
+                for record in key_records:
+                    f.write(json.dumps({'chave': key, 'pr': record}, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(f"{self.records_path}.tmp", self.records_path)
+        return True
+
+    def save_plan(self, plan):
+        """
+        Guarda a lista de unidades da coleta, para que a retomada use exatamente
+        as mesmas chaves (ex.: janelas de datas calculadas no início).
+        """
+        with self._lock:
+            self.plan = plan
+            _write_json_atomically(self.state_path, self._state())
+
+    def start_sink(self, sink, start=0):
+        """
+        Passa a registrar as páginas na saída `sink` (um `JsonlSink`) em vez
+        do arquivo de registros. `start` é o tamanho que a saída tinha antes
+        da coleta (modo incremental), devolvido em `sink['start']` na retomada.
+        """
+        with self._lock:
+            self.sink = {'start': start, 'offset': sink.sync()}
+            _write_json_atomically(self.state_path, self._state())
+
+    def truncate_sink(self, path):
+        """Descarta da saída JSON Lines as linhas gravadas depois do último estado confirmado."""
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size < self.sink['offset']:
+            raise RuntimeError(f"'{path}' tem {size} bytes, menos que os {self.sink['offset']} "
+                               "confirmados pelo checkpoint; não é possível retomar.")
+        os.truncate(path, self.sink['offset'])
+        return size - self.sink['offset']
+
+    def is_finished(self, key):
+        return key in self.finished
+
+    def has_state(self, key):
+        return key in self.finished or key in self.in_progress
+
+    def _saved_records(self, key, count):
+        if self.sink is not None and key not in self.records:
+            # Os registros estão na saída JSON Lines: só a quantidade importa
+            return [None] * count
+        return list(self.records.get(key, []))
+
+    def finished_records(self, key):
+        return self._saved_records(key, self.finished.get(key, 0))
+
+    def start_for(self, key):
+        """Estado inicial (prs, has_next_page, cursor) de uma unidade em andamento, ou None."""
+        info = self.in_progress.get(key)
+        if info is None:
+            return None
+        return self._saved_records(key, info['prs']), True, info['cursor']
+
+    def record_page(self, key, new_records, total_prs, cursor, done, sink=None):
+        """
+        Registra duravelmente uma página recém-processada da unidade `key`.
+        Com `sink`, os registros são escritos na saída JSON Lines (sob o mesmo
+        lock do estado, para que o tamanho confirmado corresponda exatamente
+        às páginas registradas) e não no arquivo de registros.
+        """
+        with self._lock:
+            if sink is not None:
+                sink.write(new_records)
+                self.sink['offset'] = sink.sync()
+            else:
+                with open(self.records_path, 'a', encoding='utf-8') as f:
+                    for record in new_records:
+                        f.write(json.dumps({'chave': key, 'pr': record}, ensure_ascii=False) + '\n')
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            if done:
+                self.in_progress.pop(key, None)
+                self.finished[key] = total_prs
+            else:
+                self.in_progress[key] = {'cursor': cursor, 'prs': total_prs}
+            _write_json_atomically(self.state_path, self._state())
+
+    def clear(self):
+        """Remove os arquivos do checkpoint depois que a saída final foi gravada."""
+        for path in (self.state_path, self.records_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _state(self):
+        state = {'finished': self.finished, 'in_progress': self.in_progress, 'plan': self.plan}
+        if self.sink is not None:
+            state['sink'] = self.sink
+        return state
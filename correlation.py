@@ -0,0 +1,211 @@
+import hashlib
+import weakref
+
+import numpy as np
+import pandas as pd
+from scipy import special
+from scipy.stats import mannwhitneyu, pearsonr, rankdata, spearmanr
+
+
+def t_test_pvalues(r, n_obs):
+    """
+    p-valores bicaudais de coeficientes de correlação (escalar ou matriz), pela
+    estatística t com n_obs - 2 graus de liberdade, com as mesmas operações
+    de `scipy.stats.spearmanr`.
+    """
+    dof = n_obs - 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Arredondamentos podem deixar o radicando levemente negativo
+        t = r * np.sqrt((dof / ((r + 1.0) * (1.0 - r))).clip(0))
+    return 2 * special.stdtr(dof, -np.abs(t))
+
+
+def _pairwise_spearman(frame):
+    """Caminho antigo, par a par, para dados com valores ausentes."""
+    rho = frame.corr(method='spearman')
+    p_values = pd.DataFrame(np.zeros_like(rho), columns=rho.columns, index=rho.index)
+    for i, col1 in enumerate(frame.columns):
+        for j, col2 in enumerate(frame.columns):
+            if i != j:
+                p_values.iloc[i, j] = spearmanr(frame[col1], frame[col2])[1]
+    return rho, p_values
+
+
+def spearman_matrix(frame):
+    """
+    Matriz de correlação de Spearman (ρ) e matriz de p-valores das colunas de
+    `frame` numa única passada: cada coluna é ordenada (rank) uma vez, a
+    matriz ρ inteira sai de um produto matricial dos ranks centrados e todos
+    os p-valores de uma conta vetorizada da distribuição t.
+
+    Os números são os de `scipy.stats.spearmanr` (ranks médios em empates,
+    Pearson sobre os ranks, mesmo teste t); a diagonal de p-valores é 0.
+    Com valores ausentes, volta ao cálculo par a par do pandas/scipy.
+
+    Returns:
+        tuple: (DataFrame de ρ, DataFrame de p-valores), indexados pelas colunas.
+    """
+    values = frame.to_numpy(dtype=float)
+    if np.isnan(values).any():
+        return _pairwise_spearman(frame)
+
+    ranks = rankdata(values, axis=0)
+    rho = np.corrcoef(ranks, rowvar=False)
+    p_values = t_test_pvalues(rho, len(values))
+    np.fill_diagonal(p_values, 0.0)
+
+    columns = frame.columns
+    return (pd.DataFrame(rho, index=columns, columns=columns),
+            pd.DataFrame(p_values, index=columns, columns=columns))
+
+
+# --- CACHE DE RANKS ---
+
+def rank_with_ties(values):
+    """
+    Ranks médios (como `scipy.stats.rankdata`) e tamanhos dos grupos de
+    empate, em ordem crescente de valor, a partir de uma única ordenação.
+    """
+    order = np.argsort(values, kind='mergesort')
+    sorted_values = values[order]
+    is_first = np.concatenate(([True], sorted_values[1:] != sorted_values[:-1]))
+    bounds = np.concatenate((np.flatnonzero(is_first), [len(values)]))
+    # Empatados em [início, fim) recebem a média dos ranks início+1 … fim
+    average = (bounds[:-1] + bounds[1:] + 1) / 2
+    ranks = np.empty(len(values))
+    ranks[order] = average[np.cumsum(is_first) - 1]
+    return ranks, np.diff(bounds).astype(float)
+
+
+class RankCache:
+    """
+    Ranks das colunas de um DataFrame, calculados uma vez por (coluna,
+    subconjunto de linhas) e reaproveitados por todas as correlações e
+    testes de Mann-Whitney sobre o mesmo DataFrame.
+
+    O subconjunto é uma máscara booleana das linhas (None = todas); máscaras
+    iguais, mesmo que criadas de novo, caem na mesma entrada. O cache supõe
+    que as colunas já ranqueadas não são sobrescritas no DataFrame.
+    """
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.sorts = 0
+        self._ranks = {}
+
+    @staticmethod
+    def _subset_key(mask):
+        if mask is None:
+            return None
+        mask = np.asarray(mask, dtype=bool)
+        if mask.all():
+            return None
+        return hashlib.sha1(np.packbits(mask).tobytes()).hexdigest()
+
+    def ranks(self, column, mask=None):
+        """(ranks, tamanhos dos empates) de `column` nas linhas de `mask`."""
+        key = (column, self._subset_key(mask))
+        if key not in self._ranks:
+            values = self.frame[column].to_numpy(dtype=float)
+            if key[1] is not None:
+                values = values[np.asarray(mask, dtype=bool)]
+            self._ranks[key] = rank_with_ties(values)
+            self.sorts += 1
+        return self._ranks[key]
+
+    def spearman(self, column1, column2, mask=None):
+        """(ρ, p-valor) de Spearman, iguais aos de `scipy.stats.spearmanr`."""
+        ranks1, _ = self.ranks(column1, mask)
+        ranks2, _ = self.ranks(column2, mask)
+        rho = np.corrcoef(np.column_stack((ranks1, ranks2)), rowvar=False)
+        return rho[1, 0], t_test_pvalues(rho, len(ranks1))[1, 0]
+
+    def mann_whitney(self, column, mask1, mask2, use_continuity=True):
+        """
+        Teste de Mann-Whitney bicaudal de `column` entre as linhas de `mask1`
+        e de `mask2`, pela aproximação normal com correção de empates (a que
+        `scipy.stats.mannwhitneyu` usa para amostras grandes ou com empates).
+
+        Returns:
+            tuple: (U1, p-valor), como `scipy.stats.mannwhitneyu`.
+        """
+        mask1, mask2 = np.asarray(mask1, dtype=bool), np.asarray(mask2, dtype=bool)
+        n1, n2 = int(mask1.sum()), int(mask2.sum())
+        combined = mask1 | mask2
+        ranks, ties = self.ranks(column, combined)
+        if (n1 <= 8 or n2 <= 8) and not (ties > 1).any():
+            # Amostras pequenas sem empates: o scipy usa a distribuição exata
+            values = self.frame[column].to_numpy(dtype=float)
+            result = mannwhitneyu(values[mask1], values[mask2], use_continuity=use_continuity)
+            return result.statistic, result.pvalue
+
+        U1 = ranks[mask1[combined]].sum() - n1 * (n1 + 1) / 2
+        U = max(U1, n1 * n2 - U1)
+        n = n1 + n2
+        s = np.sqrt(n1 * n2 / 12 * ((n + 1) - np.sum(ties ** 3 - ties) / (n * (n - 1))))
+        numerator = U - n1 * n2 / 2 - (0.5 if use_continuity else 0.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z = numerator / s
+        return U1, float(np.clip(2 * special.ndtr(-z), 0.0, 1.0))
+
+
+_rank_caches = {}
+
+
+def rank_cache_for(frame):
+    """Cache de ranks compartilhado de um DataFrame (descartado junto com ele)."""
+    key = id(frame)
+    if key not in _rank_caches:
+        _rank_caches[key] = RankCache(frame)
+        weakref.finalize(frame, _rank_caches.pop, key, None)
+    return _rank_caches[key]
+
+
+# --- ANÁLISE DAS QUESTÕES DE PESQUISA ---
+
+def analise_correlacao_completa(var1_name, var2_name, dados):
+    """
+    Spearman (ranks do cache compartilhado de `dados`) e Pearson entre duas
+    variáveis, com a classificação de força, direção e significância usada
+    nas respostas às RQs.
+    """
+    rho, p_spearman = rank_cache_for(dados).spearman(var1_name, var2_name)
+    r, p_pearson = pearsonr(dados[var1_name], dados[var2_name])
+
+    abs_rho = abs(rho)
+    if abs_rho < 0.1:
+        forca = "Trivial"
+    elif abs_rho < 0.3:
+        forca = "Fraca"
+    elif abs_rho < 0.5:
+        forca = "Moderada"
+    elif abs_rho < 0.7:
+        forca = "Forte"
+    else:
+        forca = "Muito Forte"
+
+    direcao = "Positiva" if rho > 0 else "Negativa"
+
+    if p_spearman < 0.001:
+        sig = "***"
+        sig_text = "Altamente significativa"
+    elif p_spearman < 0.01:
+        sig = "**"
+        sig_text = "Muito significativa"
+    elif p_spearman < 0.05:
+        sig = "*"
+        sig_text = "Significativa"
+    else:
+        sig = "ns"
+        sig_text = "Não significativa"
+
+    return {
+        'spearman_rho': rho,
+        'spearman_p': p_spearman,
+        'pearson_r': r,
+        'pearson_p': p_pearson,
+        'forca': forca,
+        'direcao': direcao,
+        'significancia': sig,
+        'sig_text': sig_text
+    }
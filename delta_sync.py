@@ -0,0 +1,128 @@
+import json
+import os
+
+from jsonl_sink import read_jsonl
+from pr_dataset import read_parquet_records
+
+
+def pr_key(record):
+    """Identidade de um PR no conjunto de dados."""
+    return record['repositorio'], record['pr_number']
+
+
+def delta_search_query(base_query, since):
+    """Restringe `base_query` aos PRs fechados a partir de `since` (closedAt ISO 8601)."""
+    return f"{base_query} closed:>={since}"
+
+
+def _update_newest(newest, record):
+    repo = record['repositorio']
+    if record['data_fechamento'] > newest.get(repo, ''):
+        newest[repo] = record['data_fechamento']
+
+
+def newest_closed_at(records):
+    """
+    closedAt mais recente de cada repositório (strings ISO 8601 em UTC comparam
+    em ordem). Aceita qualquer iterável, inclusive o gerador de `read_jsonl`.
+    """
+    newest = {}
+    for record in records:
+        _update_newest(newest, record)
+    return newest
+
+
+def load_watermarks(path):
+    """Carrega o último closedAt sincronizado por repositório (vazio se não houver estado)."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_watermarks(path, watermarks):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(watermarks, f, ensure_ascii=False, indent=4, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def load_dataset(path):
+    """Lê o conjunto de PRs existente, em JSON, JSON Lines ou Parquet (lista vazia se não existir)."""
+    if not os.path.exists(path):
+        return []
+    if path.endswith('.jsonl'):
+        return list(read_jsonl(path))
+    if path.endswith('.parquet'):
+        return read_parquet_records(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def iter_dataset(path):
+    """Como `load_dataset`, mas JSON Lines é lido registro a registro, sem carregar o arquivo."""
+    if path.endswith('.jsonl') and os.path.exists(path):
+        return read_jsonl(path)
+    return load_dataset(path)
+
+
+def upsert_records(existing, new_records):
+    """
+    Mescla `new_records` em `existing` por (repositorio, pr_number): PRs já
+    presentes são substituídos no lugar e os novos vão para o final.
+
+    Returns:
+        tuple: (registros mesclados, quantidade inserida, quantidade atualizada)
+    """
+    merged = {pr_key(record): record for record in existing}
+    inserted = updated = 0
+    for record in new_records:
+        key = pr_key(record)
+        if key in merged:
+            updated += 1
+        else:
+            inserted += 1
+        merged[key] = record
+    return list(merged.values()), inserted, updated
+
+
+def merge_appended_jsonl(path, appended_from):
+    """
+    Mescla os PRs anexados a `path` a partir do byte `appended_from` (coleta
+    incremental no modo jsonl) com os que já estavam no arquivo: a versão
+    anexada substitui a antiga, mantendo a posição dos novos no final, e o
+    arquivo é regravado atomicamente. As linhas antigas são copiadas uma a uma;
+    só os PRs anexados nesta execução ficam em memória.
+
+    Returns:
+        tuple: (total de PRs, quantidade substituída, último closedAt por repositório)
+    """
+    with open(path, 'rb') as f:
+        f.seek(appended_from)
+        appended, _, _ = upsert_records([], (json.loads(line) for line in f if line.strip()))
+    appended_keys = {pr_key(record) for record in appended}
+
+    total = replaced = 0
+    newest = {}
+    tmp_path = f"{path}.tmp"
+    with open(path, 'rb') as source, open(tmp_path, 'w', encoding='utf-8') as out:
+        remaining = appended_from
+        for line in source:
+            if remaining <= 0:
+                break
+            remaining -= len(line)
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if pr_key(record) in appended_keys:
+                replaced += 1
+                continue
+            out.write(line.decode('utf-8').rstrip('\n') + '\n')
+            _update_newest(newest, record)
+            total += 1
+        for record in appended:
+            out.write(json.dumps(record, ensure_ascii=False) + '\n')
+            _update_newest(newest, record)
+            total += 1
+    os.replace(tmp_path, path)
+    return total, replaced, newest
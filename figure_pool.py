@@ -0,0 +1,103 @@
+import multiprocessing
+import os
+import pickle
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+# Processos que renderizam os PNGs; 0 renderiza no próprio processo, em série.
+# Com um único núcleo o pool só disputaria a CPU com o script, então fica desligado.
+_CPUS = os.cpu_count() or 1
+DEFAULT_WORKERS = int(os.environ.get("PR_ANALISE_PROCESSOS_FIGURAS", _CPUS if _CPUS > 1 else 0))
+
+# Opções de savefig de todos os gráficos das análises
+SAVEFIG_OPTIONS = {"dpi": 300, "bbox_inches": "tight"}
+
+
+def _init_worker():
+    import matplotlib.pyplot as plt
+
+    # Descarta as figuras herdadas do processo principal e garante um backend sem janela
+    plt.switch_backend("Agg")
+
+
+def _render(payload, path, options):
+    """Tarefa do processo de renderização: reconstrói a figura e grava o PNG."""
+    import matplotlib.pyplot as plt
+
+    fig = pickle.loads(payload)
+    fig.savefig(path, **options)
+    plt.close(fig)
+    return path
+
+
+def _can_fork():
+    # Os scripts de análise não têm guarda `if __name__ == "__main__"`: com
+    # spawn/forkserver cada processo filho reexecutaria a análise inteira. No
+    # macOS o fork não é seguro com os frameworks do sistema.
+    return "fork" in multiprocessing.get_all_start_methods() and sys.platform != "darwin"
+
+
+class FigurePool:
+    """
+    Renderiza as figuras das análises em paralelo. `save` serializa a figura
+    já montada (artistas, dados e layout) e a entrega a um processo do pool,
+    que faz o desenho em alta resolução e a codificação do PNG enquanto o
+    script segue calculando e montando a próxima figura. `wait` espera todos
+    os arquivos e repassa qualquer erro de renderização.
+
+    Sem processos disponíveis (workers=0, plataforma sem fork) ou com uma
+    figura que não pode ser serializada, o PNG é gravado na hora, como antes.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS):
+        self.workers = workers
+        self._executor = None
+        self._pending = []  # (arquivo, future), na ordem de submissão
+
+    def _executor_or_none(self):
+        if self.workers < 1 or not _can_fork():
+            return None
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("fork"),
+                initializer=_init_worker,
+            )
+        return self._executor
+
+    def save(self, fig, path, **options):
+        """Grava `fig` em `path` (em segundo plano quando possível) e fecha a figura."""
+        import matplotlib.pyplot as plt
+
+        options = {**SAVEFIG_OPTIONS, **options}
+        executor = self._executor_or_none()
+        payload = None
+        if executor is not None:
+            try:
+                payload = pickle.dumps(fig, protocol=pickle.HIGHEST_PROTOCOL)
+            except (pickle.PicklingError, TypeError, AttributeError) as e:
+                print(f"⚠️ '{path}' não pôde ser enviada ao pool ({e}); renderizando aqui.")
+
+        if payload is None:
+            fig.savefig(path, **options)
+            print(f"✓ Salvo: {path}")
+        else:
+            self._pending.append((path, executor.submit(_render, payload, path, options)))
+            print(f"⏳ Renderizando em segundo plano: {path}")
+        plt.close(fig)
+
+    def wait(self):
+        """Espera todas as figuras enviadas ao pool e encerra os processos."""
+        pending, self._pending = self._pending, []
+        try:
+            for path, future in pending:
+                future.result()
+                print(f"✓ Salvo: {path}")
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+
+# Pool único dos gráficos do processo.
+figure_pool = FigurePool()
@@ -1,15 +1,32 @@
-import requests
+import argparse
 import json
 import time
 import os 
 
+from github_client import GraphQLAuthError, GraphQLClient, RetryPolicy, retry_cause
+from graphql_batch import build_batched_query, chunked, graphql_string, split_batched_response
+from pr_index import open_default_index, records_from_repository
+from response_cache import ResponseCache
+from telemetry import telemetry
+
 GITHUB_TOKEN = ""
-GITHUB_API_URL = "https://api.github.com/graphql"
-HEADERS = {
-    "Authorization": f"bearer {GITHUB_TOKEN}",
-    "Content-Type": "application/json",
+
+# Tokens adicionais para dividir o orçamento de rate limit (ou GITHUB_TOKENS=tok1,tok2 no ambiente)
+GITHUB_TOKENS = []
+
+# Validade das respostas em cache por operação GraphQL (ver response_cache.py)
+CACHE_TTL_SECONDS = {
+    "GetTopRepositoriesList": 6 * 3600,
+    "GetRepositoryPullRequestDetails": 24 * 3600,
+    "GetRepositoriesPullRequestDetails": 24 * 3600,
 }
 
+# Cliente compartilhado: sessão keep-alive, timeouts, rate limit e cache em disco (ver github_client.py)
+client = GraphQLClient(GITHUB_TOKEN, cache=ResponseCache(ttls=CACHE_TTL_SECONDS), tokens=GITHUB_TOKENS or None)
+
+# Índice global de PRs (ver pr_index.py), alimentado só com --indexar
+pr_index = None
+
 GET_REPOS_QUERY = '''
 query GetTopRepositoriesList($cursor: String) {
   search(
@@ -33,73 +50,56 @@ query GetTopRepositoriesList($cursor: String) {
 }'''
 
 
-REPO_PR_DETAILS_QUERY  = '''
-query GetRepositoryPullRequestDetails($owner: String!, $name: String!) {
-  repository(owner: $owner, name: $name) {
-    # Aqui, a query começa no nível do repositório específico
-    nameWithOwner
-
-    pullRequests(states: [MERGED, CLOSED], first: 100) {
-      totalCount
-      nodes {
-        ... on PullRequest {
-          title
-          number
-          state
-          url
-          createdAt
-          mergedAt
-          closedAt
-          author {
-            login
-          }
-          reviews(first: 1) {
-            totalCount
-          }
-          comments {
-            totalCount
-          }
-          additions
-          deletions
-          changedFiles
+# Campos de PRs de um repositório, compartilhados pela query individual e pela query em lote.
+REPO_PR_DETAILS_FRAGMENT = '''
+fragment RepositoryPullRequestDetails on Repository {
+  nameWithOwner
+
+  pullRequests(states: [MERGED, CLOSED], first: 100) {
+    totalCount
+    nodes {
+      ... on PullRequest {
+        title
+        number
+        state
+        url
+        createdAt
+        mergedAt
+        closedAt
+        author {
+          login
+        }
+        reviews(first: 1) {
+          totalCount
+        }
+        comments {
+          totalCount
         }
+        additions
+        deletions
+        changedFiles
       }
     }
   }
 }
 '''
 
+REPO_PR_DETAILS_QUERY  = '''
+query GetRepositoryPullRequestDetails($owner: String!, $name: String!) {
+  repository(owner: $owner, name: $name) {
+    # Aqui, a query começa no nível do repositório específico
+    ...RepositoryPullRequestDetails
+  }
+}
+''' + REPO_PR_DETAILS_FRAGMENT
+
 def run_query(query, variables):
     """
     Função para executar a query GraphQL, com retentativas e timeout.
     """
-    headers = {"Authorization": f"Bearer {GITHUB_TOKEN}"}
-    max_retries = 7
-    base_wait_time = 5
-
-    for attempt in range(max_retries):
-        try:
-            request = requests.post(
-                URL, 
-                json={'query': query, 'variables': variables}, 
-                headers=headers, 
-                timeout=30
-            )
-            
-            if request.status_code == 502:
-                print(f"  -> Tentativa {attempt + 1}/{max_retries}: Recebido erro 502 (Bad Gateway). Tentando novamente em {base_wait_time * (attempt + 1)}s...")
-                time.sleep(base_wait_time * (attempt + 1))
-                continue
-
-            request.raise_for_status()
-            
-            return request.json()
-
-        except requests.exceptions.RequestException as e:
-            print(f"  -> Tentativa {attempt + 1}/{max_retries}: Ocorreu um erro de requisição: {e}. Tentando novamente em {base_wait_time * (attempt + 1)}s...")
-            time.sleep(base_wait_time * (attempt + 1))
-    
-    raise Exception(f"Query falhou após {max_retries} tentativas.")
+    # 7 tentativas com espera linear de 5s, 10s, 15s...
+    policy = RetryPolicy(max_attempts=7, base_wait=5, backoff="linear")
+    return client.execute(query, variables, retry_policy=policy)
 
 # def get_top_repos(query):
 #     all_repos = []
@@ -176,61 +176,54 @@ def fetch_repo_details_and_append_line(
         return False
 
     variables = {"owner": owner, "name": name}
+    telemetry.start_repo(full_repo_name['nameWithOwner'])
+    # As retentativas ficam neste laço (que também cobre erros GraphQL); o cliente faz uma tentativa por vez.
+    single_attempt = RetryPolicy(max_attempts=1)
     attempt = 0
     
     while attempt < max_retries:
         attempt += 1
         
         try:
-            # 2. Executa a Requisição com Timeout
-            data = {'query': REPO_PR_DETAILS_QUERY, 'variables': variables}
-            response = requests.post(GITHUB_API_URL, headers=HEADERS, json=data, timeout=15)
+            # 2. Executa a Requisição (o cliente aguarda orçamento de rate limit, se necessário;
+            #    um 403 por rate limit faz a próxima tentativa esperar exatamente até o reset)
+            result = client.execute(REPO_PR_DETAILS_QUERY, variables, retry_policy=single_attempt)
 
-            # 3. Verifica o Status da Resposta
-            if response.status_code == 200:
-                result = response.json()
-                
-                # Tratamento de Erros GraphQL (lógicos)
-                if 'errors' in result:
-                    error_msg = result['errors'][0]['message'] if 'message' in result['errors'][0] else "Erro GraphQL desconhecido."
-                    if "Could not resolve to a Repository" in error_msg:
-                         print(f"FALHA IRRECUPERÁVEL: Repositório '{full_repo_name}' não existe ou é privado.")
-                         return False
-                    else:
-                         raise Exception(f"Erro GraphQL: {error_msg}")
-                
-                # 4. Verifica e Salva os Dados
-                if 'data' in result and result['data']['repository']:
-                    repo_data = result['data']['repository']
-                    pr_count = repo_data['pullRequests']['totalCount']
-                    
-                    # Salva os Dados em modo APPEND ('a') como JSON Lines
-                    with open(output_filename, 'a', encoding='utf-8') as f:
-                        # json.dumps serializa o objeto Python em uma string JSON de linha única
-                        f.write(json.dumps(repo_data, ensure_ascii=False) + '\n')
-                    
-                    print(f"SUCESSO! Dados do repositório com {pr_count} PRs anexados a '{output_filename}'.")
-                    return True # Sai da função após o sucesso
-                
+            # 3. Tratamento de Erros GraphQL (lógicos)
+            if 'errors' in result:
+                error_msg = result['errors'][0]['message'] if 'message' in result['errors'][0] else "Erro GraphQL desconhecido."
+                if "Could not resolve to a Repository" in error_msg:
+                     print(f"FALHA IRRECUPERÁVEL: Repositório '{full_repo_name}' não existe ou é privado.")
+                     return False
                 else:
-                    raise Exception("Resposta válida, mas campo 'repository' é nulo ou vazio.")
+                     raise Exception(f"Erro GraphQL: {error_msg}")
             
-            # Tratamento de Erros de Status HTTP
-            elif response.status_code == 401:
-                print("FALHA IRRECUPERÁVEL: Token de Acesso Inválido (401 Unauthorized).")
-                return False
+            # 4. Verifica e Salva os Dados
+            if 'data' in result and result['data']['repository']:
+                repo_data = result['data']['repository']
+                pr_count = repo_data['pullRequests']['totalCount']
+                
+                # Salva os Dados em modo APPEND ('a') como JSON Lines
+                with open(output_filename, 'a', encoding='utf-8') as f:
+                    # json.dumps serializa o objeto Python em uma string JSON de linha única
+                    f.write(json.dumps(repo_data, ensure_ascii=False) + '\n')
+                if pr_index is not None:
+                    pr_index.upsert(records_from_repository(repo_data))
+                telemetry.record_prs(repo_data['nameWithOwner'], len(repo_data['pullRequests']['nodes']))
+                
+                print(f"SUCESSO! Dados do repositório com {pr_count} PRs anexados a '{output_filename}'.")
+                return True # Sai da função após o sucesso
             
             else:
-                 raise requests.exceptions.RequestException(f"Erro na Requisição: {response.status_code}")
+                raise Exception("Resposta válida, mas campo 'repository' é nulo ou vazio.")
 
+        # Tratamento de Erros de Status HTTP
+        except GraphQLAuthError:
+            print("FALHA IRRECUPERÁVEL: Token de Acesso Inválido (401 Unauthorized).")
+            return False
 
-        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError, requests.exceptions.RequestException, Exception) as e:
-            
-            # Tratamento de Rate Limit do GitHub (código 403)
-            if 'response' in locals() and response.status_code == 403 and 'X-RateLimit-Remaining' in response.headers and int(response.headers['X-RateLimit-Remaining']) == 0:
-                print("⚠️ ATENÇÃO: Limite de taxa (Rate Limit) do GitHub atingido. Pausando por 60 segundos...")
-                time.sleep(60)
-            
+        except Exception as e:
+            telemetry.count_retry(retry_cause(e))
             wait_time = 2 ** attempt
             print(f"Tentativa {attempt} falhou ({type(e).__name__}: {e}). Aguardando {wait_time} segundos antes de tentar novamente...")
             time.sleep(wait_time)
@@ -239,9 +232,89 @@ def fetch_repo_details_and_append_line(
     print(f"FALHA FINAL: Não foi possível obter e salvar os dados de '{full_repo_name}' após {max_retries} tentativas.")
     return False
 
+def fetch_repo_details_batch_and_append_lines(
+    repos: list,
+    output_filename: str = "repositorios_coletados.jsonl"
+) -> int:
+    """
+    Busca os detalhes de PRs de vários repositórios numa única query (um alias
+    por repositório) e anexa cada resultado ao arquivo JSON Lines. Repositórios
+    que falharem no lote são tentados individualmente com
+    `fetch_repo_details_and_append_line`.
+
+    Args:
+        repos (list): Itens no formato {'nameWithOwner': 'owner/name', ...}.
+        output_filename (str): Nome do arquivo de saída no formato JSON Lines.
+
+    Returns:
+        int: Quantidade de repositórios salvos com sucesso.
+    """
+    names = [repo['nameWithOwner'] for repo in repos]
+    print(f"--- Processando lote de {len(names)} repositórios: {', '.join(names)} ---")
+
+    selections = []
+    for full_name in names:
+        owner, _, name = full_name.partition('/')
+        selections.append(
+            f"repository(owner: {graphql_string(owner)}, name: {graphql_string(name)}) {{ ...RepositoryPullRequestDetails }}"
+        )
+    query = build_batched_query("GetRepositoriesPullRequestDetails", selections, REPO_PR_DETAILS_FRAGMENT)
+    for full_name in names:
+        telemetry.start_repo(full_name)
+
+    try:
+        result = run_query(query, {})
+    except Exception as e:
+        print(f"Falha na query em lote ({e}). Coletando os repositórios individualmente...")
+        result = None
+
+    saved = 0
+    for repo, repo_data in zip(repos, split_batched_response(result, len(repos))):
+        if not repo_data:
+            saved += fetch_repo_details_and_append_line(repo, output_filename=output_filename)
+            continue
+        with open(output_filename, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(repo_data, ensure_ascii=False) + '\n')
+        if pr_index is not None:
+            pr_index.upsert(records_from_repository(repo_data))
+        telemetry.record_prs(repo_data['nameWithOwner'], len(repo_data['pullRequests']['nodes']))
+        print(f"SUCESSO! Dados de '{repo_data['nameWithOwner']}' com {repo_data['pullRequests']['totalCount']} PRs anexados a '{output_filename}'.")
+        saved += 1
+    return saved
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Coleta os PRs dos repositórios filtrados em JSON Lines.")
+    parser.add_argument(
+        "--lote", type=int, default=1,
+        help="Quantidade de repositórios buscados numa única query (1 = uma query por repositório).")
+    parser.add_argument(
+        "--sem-cache", action="store_true",
+        help="Ignora as respostas em cache (elas são buscadas de novo na API e o cache é renovado).")
+    parser.add_argument(
+        "--indexar", action="store_true",
+        help="Também registra os PRs coletados no índice global ('indice_prs.jsonl') e no banco SQLite "
+             "(ver pr_index.py). O índice mantém todos os PRs em memória durante a coleta.")
+    parser.add_argument(
+        "--telemetria", metavar="ARQUIVO",
+        help="Grava métricas da coleta (latência, retentativas, pontos, PRs/s) periodicamente neste "
+             "arquivo: JSON, ou formato texto do Prometheus se terminar em .prom.")
+    args = parser.parse_args()
+    if args.lote < 1:
+        parser.error("--lote deve ser maior ou igual a 1.")
+    return args
+
+
 # --- Execução Principal ---
 if __name__ == "__main__":
-    if not GITHUB_TOKEN:
+    args = parse_args()
+    if client.cache is not None:
+        client.cache.bypass = args.sem_cache
+    if args.telemetria:
+        telemetry.configure(args.telemetria)
+    if args.indexar:
+        pr_index = open_default_index()
+    if not any(client.token_pool.tokens):
         print("ERRO: A variável de ambiente GITHUB_TOKEN não está definida.")
     else:
         # repositories = get_top_repos(GET_REPOS_QUERY)
@@ -259,8 +332,12 @@ if __name__ == "__main__":
         with open("repositorios_filtrados_em_lotes.json", 'r', encoding='utf-8') as arquivo:
             dados_json = json.load(arquivo);
         
-        for repo in dados_json:
-            fetch_repo_details_and_append_line(repo, output_filename="repo_details.json")
+        if args.lote > 1:
+            for repo_batch in chunked(dados_json, args.lote):
+                fetch_repo_details_batch_and_append_lines(repo_batch, output_filename="repo_details.json")
+        else:
+            for repo in dados_json:
+                fetch_repo_details_and_append_line(repo, output_filename="repo_details.json")
 
 
         # if repositories_INFO:
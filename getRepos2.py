@@ -1,21 +1,37 @@
-import requests
+import argparse
 import json
-import time
+import queue
+import threading
+
+from github_client import GraphQLClient, GraphQLRequestError, RetryPolicy
+from response_cache import ResponseCache
+from telemetry import telemetry
 
 # --- CONFIGURAÇÃO ---
 # ⚠️ SUBSTITUA PELO SEU TOKEN DE ACESSO PESSOAL DO GITHUB
 GITHUB_TOKEN = ""
-GITHUB_API_URL = "https://api.github.com/graphql"
 
-HEADERS = {
-    "Authorization": f"bearer {GITHUB_TOKEN}",
-    "Content-Type": "application/json",
+# Tokens adicionais para dividir o orçamento de rate limit (ou GITHUB_TOKENS=tok1,tok2 no ambiente)
+GITHUB_TOKENS = []
+
+# Validade das respostas em cache por operação GraphQL (ver response_cache.py)
+CACHE_TTL_SECONDS = {
+    "GetTopRepositoriesList": 6 * 3600,
+    "GetTopRepositoriesWithPullRequestCount": 6 * 3600,
+    "GetRepositoryPullRequestDetails": 24 * 3600,
+    "SearchPullRequestsWithReviews": 24 * 3600,
 }
 
+# Cliente compartilhado: sessão keep-alive, timeouts, rate limit e cache em disco (ver github_client.py)
+client = GraphQLClient(GITHUB_TOKEN, cache=ResponseCache(ttls=CACHE_TTL_SECONDS), tokens=GITHUB_TOKENS or None)
+
 # Limites
 MAX_REPOS_TO_CHECK = 200  # Máximo de repositórios para buscar no total (pode ser 500, 1000, etc.)
 MIN_PRS_REQUIRED = 100    # Mínimo de PRs fechados/mesclados para manter o repositório
 
+# Lotes de descoberta buscados à frente enquanto o lote atual é filtrado (tamanho da fila)
+DISCOVERY_PREFETCH_PAGES = 2
+
 # --- QUERIES GRAPHQL ---
 # 1. Busca os nomes dos 100 repositórios mais populares por vez.
 TOP_REPOS_QUERY = """
@@ -39,6 +55,35 @@ query GetTopRepositoriesList($cursor: String) {
 }
 """
 
+# 1b. Mesma busca, mas já trazendo a contagem de PRs e metadados baratos de cada
+#     repositório, o que permite filtrar localmente sem uma query por repositório.
+TOP_REPOS_WITH_PR_COUNT_QUERY = """
+query GetTopRepositoriesWithPullRequestCount($cursor: String) {
+    search(
+        query: "is:public stars:>=1000 sort:stars-desc"
+        type: REPOSITORY
+        first: 100
+        after: $cursor
+    ) {
+        pageInfo {
+            endCursor
+            hasNextPage
+        }
+        nodes {
+            ... on Repository {
+                nameWithOwner
+                stargazerCount
+                createdAt
+                primaryLanguage { name }
+                pullRequests(states: [MERGED, CLOSED]) {
+                    totalCount
+                }
+            }
+        }
+    }
+}
+"""
+
 # 2. Busca detalhes dos PRs para um único repositório.
 REPO_PR_DETAILS_QUERY = """
 query GetRepositoryPullRequestDetails($owner: String!, $name: String!) {
@@ -83,16 +128,12 @@ query SearchPullRequestsWithReviews($searchQuery: String!) {
 }
 """
 
-def run_graphql_query(query, variables=None):
-    """Função genérica para executar qualquer query GraphQL."""
-    data = {'query': query, 'variables': variables}
-    response = requests.post(GITHUB_API_URL, headers=HEADERS, json=data)
-    
-    if response.status_code == 200:
-        return response.json()
-    else:
-        print(f"Erro na requisição: Status Code {response.status_code}")
-        print(response.text)
+def run_graphql_query(query, variables=None, retry_policy=None):
+    """Função genérica para executar qualquer query GraphQL. Devolve None em caso de falha."""
+    try:
+        return client.execute(query, variables, retry_policy=retry_policy)
+    except GraphQLRequestError as e:
+        print(f"Erro na requisição: {e}")
         return None
     
 
@@ -100,103 +141,207 @@ def run_query_with_retry(query, variables, retry_delay_seconds=10):
     """
     Executa uma query GraphQL, com retentativas infinitas em caso de erro de rede ou servidor (como 502).
     """
-    while True:
+    policy = RetryPolicy(max_attempts=None, base_wait=retry_delay_seconds, backoff="constant")
+    return run_graphql_query(query, variables, retry_policy=policy)
+
+
+def _put_until_stopped(pages, item, stop):
+    """Coloca `item` na fila limitada, desistindo se o consumidor já encerrou."""
+    while not stop.is_set():
         try:
-            # Tenta executar a query original
-            result = run_graphql_query(query, variables)
-            return result
-        except requests.exceptions.RequestException as e:
-            # Captura qualquer exceção da biblioteca requests (incluindo timeouts, erros de conexão e erros HTTP como 502)
-            print(f"\n⚠️ Erro de comunicação com a API: {e}. Tentando novamente em {retry_delay_seconds} segundos...")
-            time.sleep(retry_delay_seconds)
+            pages.put(item, timeout=0.5)
+            return
+        except queue.Full:
+            continue
+
+
+def discover_repository_pages(pages, stop):
+    """
+    Produtor do pipeline: segue os `endCursor` da busca de repositórios e
+    coloca cada lote de nomes em `pages`. Com a fila cheia, espera o
+    consumidor (backpressure); None sinaliza o fim da descoberta.
+    """
+    cursor = None
+    discovered = 0
+    try:
+        while discovered < MAX_REPOS_TO_CHECK and not stop.is_set():
+            result = run_graphql_query(TOP_REPOS_QUERY, {"cursor": cursor})
+
+            if not result or 'data' not in result or not result['data']['search']['nodes']:
+                print("Não foi possível buscar mais repositórios ou atingiu o final da lista.")
+                break
+
+            search_data = result['data']['search']
+            repo_batch = [node['nameWithOwner'] for node in search_data['nodes'] if node]
+
+            if not repo_batch:
+                print("Lote vazio, encerrando busca.")
+                break
+
+            discovered += len(repo_batch)
+            _put_until_stopped(pages, repo_batch, stop)
+
+            if not search_data['pageInfo']['hasNextPage']:
+                print("Atingiu o final da lista de repositórios no GitHub.")
+                break
+            cursor = search_data['pageInfo']['endCursor']
+    finally:
+        _put_until_stopped(pages, None, stop)
 
 
 def fetch_process_and_filter():
-    """Busca repositórios em lotes, processa e filtra cada lote."""
+    """
+    Busca repositórios em lotes, processa e filtra cada lote. A descoberta roda
+    numa thread à frente da filtragem (até DISCOVERY_PREFETCH_PAGES lotes na
+    fila), de modo que a próxima página já está pronta quando o lote atual termina.
+    """
     print(f"--- INICIANDO COLETA E FILTRAGEM ---")
     print(f"Meta: {MAX_REPOS_TO_CHECK} repositórios. Filtro: >= {MIN_PRS_REQUIRED} PRs.")
     
     all_filtered_repos = []
-    cursor = None
     repos_checked_count = 0
+
+    pages = queue.Queue(maxsize=DISCOVERY_PREFETCH_PAGES)
+    stop = threading.Event()
+    producer = threading.Thread(target=discover_repository_pages, args=(pages, stop), daemon=True)
+    producer.start()
     
+    try:
+        while repos_checked_count < MAX_REPOS_TO_CHECK:
+            # 1. Recebe o próximo lote já descoberto pelo produtor
+            repo_batch = pages.get()
+            if repo_batch is None:
+                break
+
+            # 2. Processa e filtra o lote
+            print(f"\n--- Lote de {len(repo_batch)} repositórios coletado (Início: {repos_checked_count + 1}). Iniciando filtragem... ---")
+            
+            for full_name in repo_batch:
+                if repos_checked_count >= MAX_REPOS_TO_CHECK:
+                    break
+                    
+                # A query de busca precisa de uma string formatada, não de owner/name separados
+                search_query_string = f"repo:{full_name} is:pr is:closed"
+
+                print(f"Verificando repositório: {full_name}...")
+
+                # A ÚNICA MUDANÇA REAL NO SEU LOOP É ESTA LINHA:
+                # Trocamos `run_graphql_query` por `run_query_with_retry`
+                pr_details_result = run_query_with_retry(
+                    REPO_PR_DETAILS_QUERY2, 
+                    {"searchQuery": search_query_string}
+                )
+                
+                repos_checked_count += 1
+                
+                # Adaptei a lógica para a query de busca (search) que retorna `issueCount`
+                if pr_details_result and 'data' in pr_details_result and pr_details_result['data']['search']:
+                    repo_data = pr_details_result['data']['search']
+                    pr_count = repo_data['issueCount']
+                    
+                    if pr_count >= MIN_PRS_REQUIRED:
+                        # Como a busca não retorna o nameWithOwner, adicionamos manualmente
+                        repo_info = {'nameWithOwner': full_name, 'pullRequests': {'totalCount': pr_count}}
+                        all_filtered_repos.append(repo_info)
+                        print(f"  [{repos_checked_count}/{MAX_REPOS_TO_CHECK}] ✅ {full_name}: {pr_count} PRs. (Mantido)")
+                    else:
+                        print(f"  [{repos_checked_count}/{MAX_REPOS_TO_CHECK}] ❌ {full_name}: {pr_count} PRs. (Descartado)")
+                else:
+                    # Se a API retornar um erro no JSON (diferente de um erro HTTP)
+                    print(f"  [{repos_checked_count}/{MAX_REPOS_TO_CHECK}] ❗️ Falha ao obter dados para {full_name}. Resposta: {pr_details_result}")
+    finally:
+        # Libera o produtor caso ele esteja bloqueado na fila cheia
+        stop.set()
+        producer.join()
+
+    return all_filtered_repos
+
+def fetch_and_filter_from_search():
+    """
+    Busca repositórios em lotes e filtra cada lote localmente, usando a
+    contagem de PRs que já vem em cada nó da busca (uma requisição por lote).
+    """
+    print(f"--- INICIANDO COLETA E FILTRAGEM (contagem de PRs na busca) ---")
+    print(f"Meta: {MAX_REPOS_TO_CHECK} repositórios. Filtro: >= {MIN_PRS_REQUIRED} PRs.")
+
+    all_filtered_repos = []
+    cursor = None
+    repos_checked_count = 0
+
     while repos_checked_count < MAX_REPOS_TO_CHECK:
         print(f"\n--- Buscando lote de repositórios (Início: {repos_checked_count + 1})... ---")
-        
-        # 1. Executa a primeira query para buscar o lote
-        variables = {"cursor": cursor}
-        result = run_graphql_query(TOP_REPOS_QUERY, variables)
-        
+
+        result = run_query_with_retry(TOP_REPOS_WITH_PR_COUNT_QUERY, {"cursor": cursor})
 
         if not result or 'data' not in result or not result['data']['search']['nodes']:
             print("Não foi possível buscar mais repositórios ou atingiu o final da lista.")
             break
 
         search_data = result['data']['search']
-        repo_batch = [node['nameWithOwner'] for node in search_data['nodes'] if node]
-        
-        if not repo_batch:
-            print("Lote vazio, encerrando busca.")
-            break
 
-        # 2. Processa e filtra o lote
-        print(f"Lote de {len(repo_batch)} repositórios coletado. Iniciando filtragem...")
-        
-        for full_name in repo_batch:
+        for node in search_data['nodes']:
             if repos_checked_count >= MAX_REPOS_TO_CHECK:
                 break
-                
-            # A query de busca precisa de uma string formatada, não de owner/name separados
-            search_query_string = f"repo:{full_name} is:pr is:closed"
+            if not node:
+                continue
 
-            print(f"Verificando repositório: {full_name}...")
-
-            # A ÚNICA MUDANÇA REAL NO SEU LOOP É ESTA LINHA:
-            # Trocamos `run_graphql_query` por `run_query_with_retry`
-            pr_details_result = run_query_with_retry(
-                REPO_PR_DETAILS_QUERY2, 
-                {"searchQuery": search_query_string}
-            )
-            
             repos_checked_count += 1
-            
-            # Adaptei a lógica para a query de busca (search) que retorna `issueCount`
-            if pr_details_result and 'data' in pr_details_result and pr_details_result['data']['search']:
-                repo_data = pr_details_result['data']['search']
-                pr_count = repo_data['issueCount']
-                
-                if pr_count >= MIN_PRS_REQUIRED:
-                    # Como a busca não retorna o nameWithOwner, adicionamos manualmente
-                    repo_info = {'nameWithOwner': full_name, 'pullRequests': {'totalCount': pr_count}}
-                    all_filtered_repos.append(repo_info)
-                    print(f"  [{repos_checked_count}/{MAX_REPOS_TO_CHECK}] ✅ {full_name}: {pr_count} PRs. (Mantido)")
-                else:
-                    print(f"  [{repos_checked_count}/{MAX_REPOS_TO_CHECK}] ❌ {full_name}: {pr_count} PRs. (Descartado)")
+            full_name = node['nameWithOwner']
+            pr_count = node['pullRequests']['totalCount']
+
+            if pr_count >= MIN_PRS_REQUIRED:
+                all_filtered_repos.append({
+                    'nameWithOwner': full_name,
+                    'pullRequests': {'totalCount': pr_count},
+                    'stargazerCount': node['stargazerCount'],
+                    'createdAt': node['createdAt'],
+                    'primaryLanguage': (node.get('primaryLanguage') or {}).get('name'),
+                })
+                print(f"  [{repos_checked_count}/{MAX_REPOS_TO_CHECK}] ✅ {full_name}: {pr_count} PRs. (Mantido)")
             else:
-                # Se a API retornar um erro no JSON (diferente de um erro HTTP)
-                print(f"  [{repos_checked_count}/{MAX_REPOS_TO_CHECK}] ❗️ Falha ao obter dados para {full_name}. Resposta: {pr_details_result}")
+                print(f"  [{repos_checked_count}/{MAX_REPOS_TO_CHECK}] ❌ {full_name}: {pr_count} PRs. (Descartado)")
 
-            time.sleep(0.3) # Pequena pausa para evitar Rate Limit
-        
-        # 4. Configura para a próxima iteração
         cursor = search_data['pageInfo']['endCursor']
-        has_next_page = search_data['pageInfo']['hasNextPage']
-        
-        if not has_next_page:
+        if not search_data['pageInfo']['hasNextPage']:
             print("Atingiu o final da lista de repositórios no GitHub.")
             break
 
     return all_filtered_repos
 
+
 def save_to_json(data, filename="repositorios_filtrados_em_lotes2.json"):
     """Salva os dados coletados em um arquivo JSON."""
     with open(filename, 'w', encoding='utf-8') as f:
         json.dump(data, f, indent=2, ensure_ascii=False)
     print(f"\n--- SUCESSO! Dados finais salvos em '{filename}' ({len(data)} repositórios mantidos) ---")
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Busca e filtra os repositórios mais populares do GitHub.")
+    parser.add_argument(
+        "--modo", choices=["busca", "por-repositorio"], default="busca",
+        help="'busca' lê a contagem de PRs direto da busca de repositórios; "
+             "'por-repositorio' faz uma query de PRs para cada repositório (modo antigo).")
+    parser.add_argument(
+        "--sem-cache", action="store_true",
+        help="Ignora as respostas em cache (elas são buscadas de novo na API e o cache é renovado).")
+    parser.add_argument(
+        "--telemetria", metavar="ARQUIVO",
+        help="Grava métricas da coleta (latência, retentativas, pontos, PRs/s) periodicamente neste "
+             "arquivo: JSON, ou formato texto do Prometheus se terminar em .prom.")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
+    args = parse_args()
+    if client.cache is not None:
+        client.cache.bypass = args.sem_cache
+    if args.telemetria:
+        telemetry.configure(args.telemetria)
     if GITHUB_TOKEN == "SEU_TOKEN_AQUI":
         print("ERRO: Por favor, substitua 'SEU_TOKEN_AQUI' pelo seu Personal Access Token do GitHub.")
     else:
-        final_filtered_data = fetch_process_and_filter()
+        if args.modo == "busca":
+            final_filtered_data = fetch_and_filter_from_search()
+        else:
+            final_filtered_data = fetch_process_and_filter()
         save_to_json(final_filtered_data)
\ No newline at end of file
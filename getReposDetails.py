@@ -1,69 +1,162 @@
-import requests
-import time
+import argparse
+import asyncio
 import json
-from datetime import datetime
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Optional
+
+from adaptive_paging import AdaptivePageSize
+from checkpoint import CollectionCheckpoint
+from delta_sync import (delta_search_query, iter_dataset, load_dataset, load_watermarks, merge_appended_jsonl,
+                        newest_closed_at, save_watermarks, upsert_records)
+from github_client import GraphQLAuthError, GraphQLClient, GraphQLRequestError, RetryPolicy
+from graphql_batch import build_batched_query, chunked, graphql_string, split_batched_response
+from jsonl_sink import JsonlSink, read_jsonl
+from page_normalizer import normalize_page
+from pr_dataset import DATASET_PARQUET_FILE, parquet_available, write_parquet
+from pr_index import open_default_index
+from response_cache import ResponseCache
+from search_partitions import SEARCH_RESULT_CAP, plan_windows, window_query
+from telemetry import telemetry
 
 # --- 1. CONFIGURAÇÃO ---
 GITHUB_TOKEN = ""
+# Tokens adicionais para dividir o orçamento de rate limit (ou GITHUB_TOKENS=tok1,tok2 no ambiente)
+GITHUB_TOKENS = []
 INPUT_JSON_FILE = "repositorios_filtrados_em_lotes2.json"
 OUTPUT_JSON_FILE = "dados_pull_requests3.json"
+OUTPUT_JSONL_FILE = "dados_pull_requests3.jsonl"
+OUTPUT_PARQUET_FILE = DATASET_PARQUET_FILE
+
+# Checkpoint gravado a cada página, usado por --resume para retomar uma coleta interrompida
+CHECKPOINT_STATE_FILE = "checkpoint_coleta.json"
+CHECKPOINT_RECORDS_FILE = "checkpoint_coleta_prs.jsonl"
+
+# Último closedAt coletado por repositório, usado por --incremental
+SYNC_STATE_FILE = "sincronizacao_prs.json"
 
 # <--- ALTERAÇÃO: Limite de PRs a serem buscados por repositório
 MAX_PRS_TO_FETCH_PER_REPO = 1000
 
 
 # --- 2. QUERY GRAPHQL COMPLETA ---
-# <--- ALTERAÇÃO: Aumentado de 'first: 50' para 'first: 100' para buscar mais rápido
+# Campos de cada PR, compartilhados pela query paginada e pelas queries em lote.
+PR_DETAILS_FRAGMENT = """
+fragment PullRequestDetails on PullRequest {
+  url
+  number
+  title
+  author { login }
+  createdAt
+  closedAt
+  merged
+  additions
+  deletions
+  changedFiles
+  body
+  participants(first: 1) { totalCount }
+  comments(first: 1) { totalCount }
+  reviewThreads(first: 1) { totalCount }
+  reviews(first: 1) { totalCount }
+}
+"""
+
+# Tamanho de página em `$first`, ajustado a cada página (ver adaptive_paging.py)
 GET_ALL_PR_DETAILS_QUERY = """
-query GetAllPullRequestDetails($searchQuery: String!, $cursor: String) {
-  search(query: $searchQuery, type: ISSUE, first: 100, after: $cursor) {
+query GetAllPullRequestDetails($searchQuery: String!, $cursor: String, $first: Int!) {
+  search(query: $searchQuery, type: ISSUE, first: $first, after: $cursor) {
     issueCount
     pageInfo {
       endCursor
       hasNextPage
     }
     nodes {
-      ... on PullRequest {
-        url
-        number
-        title
-        author { login }
-        createdAt
-        closedAt
-        merged
-        additions
-        deletions
-        changedFiles
-        body
-        participants(first: 1) { totalCount }
-        comments(first: 1) { totalCount }
-        reviewThreads(first: 1) { totalCount }
-        reviews(first: 1) { totalCount }
-      }
+      ...PullRequestDetails
     }
   }
 }
-"""
+""" + PR_DETAILS_FRAGMENT
+
+# Seleção da primeira página de um repositório dentro de uma query em lote (ver graphql_batch).
+FIRST_PAGE_SEARCH_SELECTION = """search(query: {search_query}, type: ISSUE, first: 100) {{
+    issueCount
+    pageInfo {{ endCursor hasNextPage }}
+    nodes {{ ...PullRequestDetails }}
+  }}"""
+
+# Contagem de resultados de uma busca (planejamento das partições por data).
+COUNT_SEARCH_SELECTION = """search(query: {search_query}, type: ISSUE, first: 1) {{ issueCount }}"""
+
+# Quantidade de contagens empacotadas numa única query.
+COUNT_BATCH_SIZE = 50
 
 # --- 3. FUNÇÕES DE APOIO ---
 
 
+# Validade das respostas em cache por operação GraphQL (ver response_cache.py)
+CACHE_TTL_SECONDS = {
+    "GetAllPullRequestDetails": 24 * 3600,
+    "GetFirstPullRequestPages": 24 * 3600,
+    "CountSearchResults": 3600,
+}
+
+# Cliente compartilhado: sessão keep-alive, timeouts, rate limit e cache em disco (ver github_client.py)
+client = GraphQLClient(GITHUB_TOKEN, cache=ResponseCache(ttls=CACHE_TTL_SECONDS), tokens=GITHUB_TOKENS or None)
+
+
+# Índice global de PRs (ver pr_index.py), alimentado só com --indexar
+pr_index = None
+
+
 def run_graphql_query(query, variables):
-    headers = {"Authorization": f"bearer {GITHUB_TOKEN}"}
-    response = requests.post("https://api.github.com/graphql",
-                             json={'query': query, 'variables': variables}, headers=headers)
-    response.raise_for_status()
-    return response.json()
+    return client.execute(query, variables)
 
 
 def run_query_with_retry(query, variables, retry_delay_seconds=5):
+    """Executa a query com retentativas infinitas em erros transitórios (502, timeout, conexão)."""
+    policy = RetryPolicy(max_attempts=None, base_wait=retry_delay_seconds, backoff="constant")
+    return client.execute(query, variables, retry_policy=policy)
+
+
+def fetch_search_page(target, cursor, page_size, retry_delay_seconds=5):
+    """
+    Busca uma página de PRs com o tamanho atual de `page_size`. Cada falha
+    (502, timeout ou erro GraphQL sem dados) diminui a página antes da nova
+    tentativa, e a latência das páginas bem-sucedidas ajusta o tamanho seguinte.
+    Tenta indefinidamente, como `run_query_with_retry`.
+    """
+    single_attempt = RetryPolicy(max_attempts=1)
     while True:
+        variables = {"searchQuery": target.search_query, "cursor": cursor, "first": page_size.size}
+        start = time.perf_counter()
         try:
-            return run_graphql_query(query, variables)
-        except requests.exceptions.RequestException as e:
-            print(
-                f"\n⚠️ Erro de comunicação com a API: {e}. Tentando novamente em {retry_delay_seconds} segundos...")
+            result = client.execute(GET_ALL_PR_DETAILS_QUERY, variables, retry_policy=single_attempt)
+        except GraphQLAuthError:
+            raise
+        except GraphQLRequestError as e:
+            if e.cause is None:
+                raise  # Falha não transitória (ex.: 4xx): repetir não adianta
+            telemetry.count_retry(e.cause)
+            if e.cause in ("502", "timeout"):
+                page_size.record_failure()
+                print(f"  -> [{target.key}] {e}. Página reduzida para {page_size.size} PRs.")
+            else:
+                print(f"  -> [{target.key}] {e}.")
+            time.sleep(retry_delay_seconds)
+            continue
+
+        if result.get('errors') and not (result.get('data') or {}).get('search'):
+            # O GitHub responde 200 com erro quando a página estoura o tempo de execução
+            telemetry.count_retry("graphql")
+            page_size.record_failure()
+            print(f"  -> [{target.key}] Erro GraphQL: {result['errors'][0].get('message')}. "
+                  f"Página reduzida para {page_size.size} PRs.")
             time.sleep(retry_delay_seconds)
+            continue
+
+        page_size.record_success(time.perf_counter() - start)
+        return result
 
 
 def load_repositories_from_json(filename):
@@ -86,96 +179,478 @@ def load_repositories_from_json(filename):
 # --- 4. SCRIPT PRINCIPAL DE EXTRAÇÃO ---
 
 
+class SearchTarget(NamedTuple):
+    """
+    Uma busca paginada de PRs: um repositório inteiro ou, no modo
+    --particionar, uma janela de datas `created:` de um repositório grande.
+    """
+    repo: str                # Repositório gravado em cada registro
+    search_query: str        # String de busca enviada à API
+    key: str                 # Chave da unidade no checkpoint
+    max_prs: Optional[int]   # Limite de PRs da unidade (None = sem limite)
+
+
+def build_search_query(repo_full_name):
+    return f"repo:{repo_full_name} is:pr is:closed reviews:>=1"
+
+
+def repo_target(repo_full_name):
+    return SearchTarget(repo_full_name, build_search_query(repo_full_name), repo_full_name, MAX_PRS_TO_FETCH_PER_REPO)
+
+
+def process_search_page(search_data, target, target_prs, checkpoint=None, sink=None):
+    """
+    Normaliza os PRs de uma página da busca e os anexa a `target_prs`,
+    respeitando o limite da unidade. Com `checkpoint`, a página é registrada
+    duravelmente antes de seguir para a próxima; com `sink`, os registros da
+    página são escritos imediatamente na saída JSON Lines (pelo checkpoint,
+    que guarda só o tamanho confirmado da saída).
+
+    Returns:
+        tuple: (has_next_page, cursor) para a próxima página.
+    """
+    previous_count = len(target_prs)
+    nodes = search_data['nodes']
+    # Ignora PRs nulos ou inacessíveis
+    valid_nodes = [pr for pr in nodes if pr]
+    for _ in range(len(nodes) - len(valid_nodes)):
+        print(f"  ... [{target.key}] Encontrado um Pull Request nulo ou inacessível. Ignorando.")
+
+    if target.max_prs is not None:
+        valid_nodes = valid_nodes[:max(0, target.max_prs - len(target_prs))]
+    # A página inteira é normalizada de uma vez, em colunas
+    target_prs.extend(normalize_page(valid_nodes, target.repo))
+
+    total_prs_in_target = search_data['issueCount']
+    if previous_count == 0 and target.max_prs is None and total_prs_in_target > SEARCH_RESULT_CAP:
+        print(f"  ⚠️ [{target.key}] {total_prs_in_target} resultados: a busca só devolve {SEARCH_RESULT_CAP}. "
+              "Use --particionar para coletar todos.")
+    print(f"  ... [{target.key}] Buscados {len(target_prs)} de {total_prs_in_target} Pull Requests.")
+
+    has_next_page = search_data['pageInfo']['hasNextPage']
+    cursor = search_data['pageInfo']['endCursor']
+    telemetry.record_prs(target.repo, len(target_prs) - previous_count)
+    if checkpoint is not None:
+        done = not has_next_page or (target.max_prs is not None and len(target_prs) >= target.max_prs)
+        checkpoint.record_page(target.key, target_prs[previous_count:], len(target_prs), cursor, done, sink)
+    elif sink is not None:
+        sink.write(target_prs[previous_count:])
+    if pr_index is not None:
+        # Com --indexar, cada página passa pelo índice global (deduplicada e atualizada no lugar)
+        pr_index.upsert(target_prs[previous_count:])
+
+    return has_next_page, cursor
+
+
+def initial_state(target, start, checkpoint):
+    """
+    Estado inicial (target_prs, has_next_page, cursor) de uma unidade: vindo
+    do lote de primeiras páginas, do checkpoint ou do zero. Unidades já
+    concluídas no checkpoint voltam com has_next_page=False.
+    """
+    telemetry.start_repo(target.repo)
+    if start is not None:
+        # A primeira página em lote desta execução já foi registrada no checkpoint
+        return start
+    if checkpoint is not None:
+        if checkpoint.is_finished(target.key):
+            print(f"  ... [{target.key}] Já concluído no checkpoint. Reaproveitando os PRs salvos.")
+            return checkpoint.finished_records(target.key), False, None
+        resumed = checkpoint.start_for(target.key)
+        if resumed is not None:
+            print(f"  ... [{target.key}] Retomando do checkpoint após {len(resumed[0])} PRs.")
+            return resumed
+    return [], True, None
+
+
+def limit_reached(target, target_prs):
+    if target.max_prs is not None and len(target_prs) >= target.max_prs:
+        print(f"  ... [{target.key}] Limite de {target.max_prs} PRs atingido. Pulando para o próximo repositório.")
+        return True
+    return False
+
+
+def fetch_repo_prs(target, start=None, checkpoint=None, sink=None):
+    """
+    Pagina a busca de PRs de uma unidade e devolve os registros normalizados.
+    `start` permite continuar de uma primeira página já obtida em lote.
+    """
+    target_prs, has_next_page, cursor = initial_state(target, start, checkpoint)
+    page_size = AdaptivePageSize()
+
+    while has_next_page and not limit_reached(target, target_prs):
+        result = fetch_search_page(target, cursor, page_size)
+
+        if not result or 'data' not in result or not result['data']['search']:
+            print(f"  ❗️ [{target.key}] Falha ao obter dados ou sem resultados para a query. Resposta: {result}")
+            break
+
+        has_next_page, cursor = process_search_page(result['data']['search'], target, target_prs, checkpoint, sink)
+
+    return target_prs
+
+
+async def fetch_repo_prs_async(target, semaphore, position, total_targets, start=None, checkpoint=None, sink=None):
+    """
+    Versão assíncrona de `fetch_repo_prs`. O semáforo limita quantas unidades
+    paginam ao mesmo tempo; cada requisição roda numa thread do executor para
+    não bloquear o loop de eventos.
+    """
+    async with semaphore:
+        print(f"\n--- Processando {position}/{total_targets}: {target.key} ---")
+
+        target_prs, has_next_page, cursor = initial_state(target, start, checkpoint)
+        page_size = AdaptivePageSize()
+
+        while has_next_page and not limit_reached(target, target_prs):
+            result = await asyncio.to_thread(fetch_search_page, target, cursor, page_size)
+
+            if not result or 'data' not in result or not result['data']['search']:
+                print(f"  ❗️ [{target.key}] Falha ao obter dados ou sem resultados para a query. Resposta: {result}")
+                break
+
+            has_next_page, cursor = process_search_page(
+                result['data']['search'], target, target_prs, checkpoint, sink)
+
+        return target_prs
+
+
+def fetch_first_pages_batched(target_batch, checkpoint=None, sink=None):
+    """
+    Busca a primeira página de PRs de várias unidades numa única query, com
+    um alias por unidade.
+
+    Returns:
+        dict: chave -> (target_prs, has_next_page, cursor), no formato do
+              parâmetro `start` dos paginadores. Unidades cujo alias falhou
+              ficam de fora e são coletadas do zero pelo paginador normal.
+    """
+    selections = [
+        FIRST_PAGE_SEARCH_SELECTION.format(search_query=graphql_string(target.search_query))
+        for target in target_batch
+    ]
+    query = build_batched_query("GetFirstPullRequestPages", selections, PR_DETAILS_FRAGMENT)
+    for target in target_batch:
+        telemetry.start_repo(target.repo)
+    try:
+        # Poucas tentativas: um lote pesado demais cai para o paginador, que ajusta o tamanho da página
+        result = client.execute(query, {}, retry_policy=RetryPolicy(max_attempts=3, base_wait=5, backoff="constant"))
+    except GraphQLAuthError:
+        raise
+    except GraphQLRequestError as e:
+        print(f"  ❗️ Falha na query em lote ({e}). As unidades serão coletadas individualmente.")
+        result = None
+
+    starts = {}
+    for target, search_data in zip(target_batch, split_batched_response(result, len(target_batch))):
+        if not search_data:
+            print(f"  ❗️ [{target.key}] Primeira página não veio no lote. Será coletada individualmente.")
+            continue
+        target_prs = []
+        has_next_page, cursor = process_search_page(search_data, target, target_prs, checkpoint, sink)
+        starts[target.key] = (target_prs, has_next_page, cursor)
+    return starts
+
+
+def fetch_all_first_pages(targets, batch_size, checkpoint=None, sink=None):
+    """
+    Aplica `fetch_first_pages_batched` a toda a lista, em lotes de `batch_size`.
+    Unidades que já têm estado no checkpoint não entram nos lotes.
+    """
+    if checkpoint is not None:
+        targets = [target for target in targets if not checkpoint.has_state(target.key)]
+
+    starts = {}
+    for target_batch in chunked(targets, batch_size):
+        print(f"\n--- Buscando a primeira página de {len(target_batch)} busca(s) em lote ---")
+        starts.update(fetch_first_pages_batched(target_batch, checkpoint, sink))
+    return starts
+
+
+def count_search_results(search_queries, batch_size=COUNT_BATCH_SIZE):
+    """`issueCount` de cada string de busca, contadas em lote (None = falha)."""
+    counts = []
+    for query_batch in chunked(search_queries, batch_size):
+        selections = [COUNT_SEARCH_SELECTION.format(search_query=graphql_string(q)) for q in query_batch]
+        result = run_query_with_retry(build_batched_query("CountSearchResults", selections), {})
+        counts += [
+            search_data['issueCount'] if search_data else None
+            for search_data in split_batched_response(result, len(query_batch))
+        ]
+    return counts
+
+
+def delta_target(repo_full_name, since):
+    """Unidade incremental: só os PRs fechados a partir de `since`, todos eles."""
+    return SearchTarget(
+        repo_full_name, delta_search_query(build_search_query(repo_full_name), since), repo_full_name, None)
+
+
+def plan_targets(target_repositories, partition, since=None):
+    """
+    Monta as unidades de coleta. Repositórios presentes em `since` (último
+    closedAt já coletado) viram buscas incrementais. Com `partition`, buscas
+    com mais de SEARCH_RESULT_CAP resultados são divididas em janelas de
+    datas, coletadas por completo (sem MAX_PRS_TO_FETCH_PER_REPO).
+    """
+    since = since or {}
+
+    def target_for(repo_full_name):
+        if repo_full_name in since:
+            return delta_target(repo_full_name, since[repo_full_name])
+        return repo_target(repo_full_name)
+
+    if not partition:
+        return [target_for(repo_full_name) for repo_full_name in target_repositories]
+
+    print(f"\n--- Planejando partições para repositórios com mais de {SEARCH_RESULT_CAP} PRs ---")
+    base_targets = [target_for(repo_full_name) for repo_full_name in target_repositories]
+    totals = count_search_results([target.search_query for target in base_targets])
+
+    targets = []
+    for repo_full_name, base_target, total in zip(target_repositories, base_targets, totals):
+        if total is not None and total <= SEARCH_RESULT_CAP:
+            targets.append(base_target)
+            continue
+
+        base_query = base_target.search_query
+        windows = plan_windows(base_query, count_search_results)
+        print(f"  ... [{repo_full_name}] {total} PRs divididos em {len(windows)} janela(s) de datas.")
+        for start, end, _ in windows:
+            search_query = window_query(base_query, start, end)
+            targets.append(SearchTarget(repo_full_name, search_query, search_query, None))
+    return targets
+
+
+async def collect_all_prs_async(targets, max_concurrency, starts=None, checkpoint=None, sink=None):
+    """
+    Coleta os PRs de todas as unidades mantendo até `max_concurrency` em
+    andamento. O resultado segue a ordem de `targets`, igual ao laço
+    sequencial. Com `sink`, os registros já foram escritos página a página e
+    só a contagem total é devolvida.
+    """
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=max_concurrency))
+
+    starts = starts or {}
+    semaphore = asyncio.Semaphore(max_concurrency)
+    total_targets = len(targets)
+
+    async def collect_target(position, target):
+        target_prs = await fetch_repo_prs_async(
+            target, semaphore, position, total_targets, starts.get(target.key), checkpoint, sink)
+        # No modo streaming, não retém os registros até o fim da coleta
+        return target_prs if sink is None else len(target_prs)
+
+    results = await asyncio.gather(*[
+        collect_target(i + 1, target) for i, target in enumerate(targets)
+    ])
+
+    if sink is not None:
+        return sum(results)
+    return [pr for target_prs in results for pr in target_prs]
+
+
+def sync_output(output_file, existing, new_records):
+    """
+    Mescla os PRs da coleta incremental na saída existente por
+    (repositorio, pr_number), regrava a saída no formato dela e atualiza o
+    último closedAt de cada repositório. (No modo jsonl a mescla é feita em
+    streaming por `merge_appended_jsonl`.)
+    """
+    merged, _, updated = upsert_records(existing, new_records)
+    print(f"Mesclando dados em '{output_file}': {len(merged)} PRs no total, "
+          f"{updated} substituído(s) pela versão mais recente.")
+
+    if output_file.endswith('.parquet'):
+        write_parquet(merged, output_file)
+    else:
+        tmp_path = f"{output_file}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(merged, f, ensure_ascii=False, indent=4)
+        os.replace(tmp_path, output_file)
+    save_watermarks(SYNC_STATE_FILE, newest_closed_at(merged))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Extrai os Pull Requests dos repositórios filtrados.")
+    parser.add_argument(
+        "--concorrencia", type=int, default=1,
+        help="Número de buscas (repositórios ou janelas) coletadas simultaneamente (1 = laço sequencial).")
+    parser.add_argument(
+        "--lote", type=int, default=1,
+        help="Quantidade de buscas cuja primeira página é obtida numa única query (1 = sem lote).")
+    parser.add_argument(
+        "--formato", choices=["json", "jsonl", "parquet"], default="json",
+        help=f"'json' grava '{OUTPUT_JSON_FILE}' ao final; 'jsonl' grava '{OUTPUT_JSONL_FILE}' "
+             f"página a página, sem manter os PRs em memória; 'parquet' grava '{OUTPUT_PARQUET_FILE}' "
+             "(colunar, lido bem mais rápido pelas análises; requer pyarrow).")
+    parser.add_argument(
+        "--particionar", action="store_true",
+        help=f"Divide repositórios com mais de {SEARCH_RESULT_CAP} PRs em janelas de datas e coleta o "
+             "histórico completo deles (use com --concorrencia para buscar as janelas em paralelo).")
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help=f"Busca só os PRs fechados depois do último closedAt de cada repositório (ver '{SYNC_STATE_FILE}') "
+             "e os mescla na saída existente por (repositorio, pr_number). Não lê o cache de respostas.")
+    parser.add_argument(
+        "--sem-cache", action="store_true",
+        help="Ignora as respostas em cache (elas são buscadas de novo na API e o cache é renovado).")
+    parser.add_argument(
+        "--indexar", action="store_true",
+        help="Também registra os PRs coletados no índice global ('indice_prs.jsonl') e no banco SQLite "
+             "(ver pr_index.py). O índice mantém todos os PRs em memória durante a coleta.")
+    parser.add_argument(
+        "--telemetria", metavar="ARQUIVO",
+        help="Grava métricas da coleta (latência, retentativas, pontos, PRs/s) periodicamente neste "
+             "arquivo: JSON, ou formato texto do Prometheus se terminar em .prom.")
+    parser.add_argument(
+        "--resume", action="store_true",
+        help=f"Retoma a coleta interrompida a partir de '{CHECKPOINT_STATE_FILE}', sem rebuscar páginas já salvas.")
+    args = parser.parse_args()
+    if args.concorrencia < 1:
+        parser.error("--concorrencia deve ser maior ou igual a 1.")
+    if args.lote < 1:
+        parser.error("--lote deve ser maior ou igual a 1.")
+    if args.formato == "parquet" and not parquet_available():
+        parser.error("--formato parquet requer o pacote 'pyarrow' (pip install pyarrow).")
+    return args
+
+
 def main():
+    global pr_index
+    args = parse_args()
+    if client.cache is not None:
+        # A sincronização incremental precisa ver o estado atual da busca: uma resposta em
+        # cache para a mesma query esconderia os PRs fechados depois que ela foi gravada
+        client.cache.bypass = args.sem_cache or args.incremental
+    if args.telemetria:
+        telemetry.configure(args.telemetria)
+    if args.indexar:
+        pr_index = open_default_index()
+
     target_repositories = load_repositories_from_json(INPUT_JSON_FILE)
     if not target_repositories:
         print("Nenhum repositório para processar. Encerrando o script.")
         return
 
-    all_prs_data = []
     total_repos = len(target_repositories)
 
     print(f"\nIniciando extração de dados para {total_repos} repositório(s).")
-    print(f"Limite de {MAX_PRS_TO_FETCH_PER_REPO} PRs por repositório.")
+    print(f"Limite de {MAX_PRS_TO_FETCH_PER_REPO} PRs por repositório"
+          f"{' (exceto os particionados, coletados por completo)' if args.particionar else ''}.")
 
-    for i, repo_full_name in enumerate(target_repositories):
-        print(
-            f"\n--- Processando Repositório {i+1}/{total_repos}: {repo_full_name} ---")
+    checkpoint = CollectionCheckpoint(CHECKPOINT_STATE_FILE, CHECKPOINT_RECORDS_FILE)
+    if args.resume:
+        if checkpoint.load():
+            print(f"♻️  Retomando do checkpoint: {len(checkpoint.finished)} busca(s) concluída(s), "
+                  f"{len(checkpoint.in_progress)} em andamento.")
+        else:
+            print(f"Nenhum checkpoint encontrado em '{CHECKPOINT_STATE_FILE}'. Iniciando do zero.")
+    else:
+        checkpoint.reset()
 
-        has_next_page = True
-        cursor = None
-        prs_fetched_for_repo = 0
-        search_query_string = f"repo:{repo_full_name} is:pr is:closed reviews:>=1"
+    output_file = {"jsonl": OUTPUT_JSONL_FILE, "parquet": OUTPUT_PARQUET_FILE}.get(args.formato, OUTPUT_JSON_FILE)
+    since = None
+    if args.incremental:
+        # Sem estado salvo, o ponto de partida é o próprio conjunto de dados existente
+        since = load_watermarks(SYNC_STATE_FILE) or newest_closed_at(iter_dataset(output_file))
+        print(f"Modo incremental: {len(since)} repositório(s) com sincronização anterior; "
+              "só PRs fechados depois dela serão buscados.")
 
-        while has_next_page:
-            if prs_fetched_for_repo >= MAX_PRS_TO_FETCH_PER_REPO:
-                print(f"  ... Limite de {MAX_PRS_TO_FETCH_PER_REPO} PRs atingido. Pulando para o próximo repositório.")
-                break
+    if checkpoint.plan is not None:
+        # Mesmas unidades (e janelas de datas) da execução interrompida
+        targets = [SearchTarget(*unit) for unit in checkpoint.plan]
+    else:
+        targets = plan_targets(target_repositories, args.particionar, since)
+        checkpoint.save_plan([list(target) for target in targets])
+    total_targets = len(targets)
 
-            variables = {"searchQuery": search_query_string, "cursor": cursor}
-            result = run_query_with_retry(GET_ALL_PR_DETAILS_QUERY, variables)
-            
-            if not result or 'data' not in result or not result['data']['search']:
-                print(f"  ❗️ Falha ao obter dados ou sem resultados para a query. Resposta: {result}")
-                break
+    sink = None
+    appended_from = 0
+    if args.formato == "jsonl":
+        print(f"Modo streaming: PRs gravados em '{OUTPUT_JSONL_FILE}' conforme as páginas chegam.")
+        if checkpoint.sink is not None:
+            # Na retomada, a saída volta ao tamanho confirmado pelo checkpoint e segue dali
+            discarded = checkpoint.truncate_sink(OUTPUT_JSONL_FILE)
+            if discarded:
+                print(f"Descartados {discarded} bytes gravados após o último checkpoint.")
+            appended_from = checkpoint.sink['start']
+            sink = JsonlSink(OUTPUT_JSONL_FILE, mode='a')
+        else:
+            # No modo incremental os PRs novos são anexados e mesclados ao final (ver `merge_appended_jsonl`)
+            if args.incremental and os.path.exists(OUTPUT_JSONL_FILE):
+                appended_from = os.path.getsize(OUTPUT_JSONL_FILE)
+            sink = JsonlSink(OUTPUT_JSONL_FILE, mode='a' if args.incremental else 'w')
+            # Checkpoint de uma coleta sem streaming: seus registros abrem a saída
+            for key_records in checkpoint.records.values():
+                sink.write(key_records)
+            checkpoint.start_sink(sink, appended_from)
+
+    try:
+        starts = fetch_all_first_pages(targets, args.lote, checkpoint, sink) if args.lote > 1 else {}
 
-            search_data = result['data']['search']
-            pull_requests = search_data['nodes']
-            
-            for pr in pull_requests:
-                # <--- CORREÇÃO AQUI ---
-                # Adiciona uma verificação para ignorar PRs nulos ou inacessíveis
-                if not pr:
-                    print("  ... Encontrado um Pull Request nulo ou inacessível. Ignorando.")
-                    continue # Pula para o próximo item do loop
-
-                if prs_fetched_for_repo >= MAX_PRS_TO_FETCH_PER_REPO:
-                    break
-                
-                # O resto do seu código continua normalmente
-                created_at = datetime.fromisoformat(pr['createdAt'].replace('Z', '+00:00'))
-                closed_at = datetime.fromisoformat(pr['closedAt'].replace('Z', '+00:00'))
-                tempo_analise_delta = closed_at - created_at
-                num_comentarios_total = pr['comments']['totalCount'] + pr['reviewThreads']['totalCount']
-                
-                all_prs_data.append({
-                    'repositorio': repo_full_name,
-                    'pr_number': pr['number'],
-                    'pr_url': pr['url'],
-                    'titulo': pr['title'],
-                    'autor': (pr.get('author') or {}).get('login', 'N/A'),
-                    'estado': 'MERGED' if pr['merged'] else 'CLOSED',
-                    'data_criacao': pr['createdAt'],
-                    'data_fechamento': pr['closedAt'],
-                    'tempo_analise_dias': round(tempo_analise_delta.total_seconds() / 86400, 2),
-                    'num_arquivos_alterados': pr['changedFiles'],
-                    'linhas_adicionadas': pr['additions'],
-                    'linhas_removidas': pr['deletions'],
-                    'tamanho_descricao_caracteres': len(pr.get('body', '') or ''),
-                    'num_participantes': pr['participants']['totalCount'],
-                    'num_comentarios': num_comentarios_total,
-                    'num_revisoes': pr['reviews']['totalCount'],
-                })
-                prs_fetched_for_repo += 1
-
-            total_prs_in_repo = search_data['issueCount']
-            print(f"  ... Buscados {prs_fetched_for_repo} de {total_prs_in_repo} Pull Requests.")
-
-            has_next_page = search_data['pageInfo']['hasNextPage']
-            cursor = search_data['pageInfo']['endCursor']
-            time.sleep(1)
+        if args.concorrencia > 1:
+            print(f"Modo assíncrono: até {args.concorrencia} buscas simultâneas.")
+            collected = asyncio.run(
+                collect_all_prs_async(targets, args.concorrencia, starts, checkpoint, sink))
+        else:
+            collected = 0 if sink is not None else []
+            for i, target in enumerate(targets):
+                print(
+                    f"\n--- Processando {i+1}/{total_targets}: {target.key} ---")
+                target_prs = fetch_repo_prs(target, starts.get(target.key), checkpoint, sink)
+                if sink is not None:
+                    collected += len(target_prs)
+                else:
+                    collected.extend(target_prs)
+    finally:
+        if sink is not None:
+            sink.close()
 
+    if sink is not None:
+        print(
+            f"\n--- Extração Finalizada. Total de {collected} PRs gravados em '{OUTPUT_JSONL_FILE}'. ---")
+        # O arquivo é percorrido em streaming, sem voltar a carregar a coleta em memória
+        if args.incremental:
+            total, replaced, watermarks = merge_appended_jsonl(OUTPUT_JSONL_FILE, appended_from)
+            print(f"Mesclando dados em '{OUTPUT_JSONL_FILE}': {total} PRs no total, "
+                  f"{replaced} substituído(s) pela versão mais recente.")
+        else:
+            watermarks = newest_closed_at(read_jsonl(OUTPUT_JSONL_FILE))
+        save_watermarks(SYNC_STATE_FILE, watermarks)
+        checkpoint.clear()
+        print("✅ Processo concluído com sucesso!")
+        return
+
+    all_prs_data = collected
     print(
         f"\n--- Extração Finalizada. Total de {len(all_prs_data)} PRs coletados. ---")
 
     # --- 5. SALVANDO DADOS EM JSON ---
+    if args.incremental:
+        sync_output(output_file, load_dataset(output_file), all_prs_data)
+        checkpoint.clear()
+        print("✅ Processo concluído com sucesso!")
+        return
+
     if not all_prs_data:
         print("Nenhum dado de PR foi coletado. O arquivo JSON não será gerado.")
         return
 
-    print(f"Salvando dados no arquivo: {OUTPUT_JSON_FILE}")
-    with open(OUTPUT_JSON_FILE, 'w', encoding='utf-8') as jsonfile:
-        json.dump(all_prs_data, jsonfile, ensure_ascii=False, indent=4)
+    # Um mesmo PR pode vir de duas buscas (ex.: repositório repetido na entrada)
+    all_prs_data, _, duplicates = upsert_records([], all_prs_data)
+    if duplicates:
+        print(f"{duplicates} PR(s) duplicado(s) descartado(s).")
+
+    print(f"Salvando dados no arquivo: {output_file}")
+    if args.formato == "parquet":
+        write_parquet(all_prs_data, output_file)
+    else:
+        with open(output_file, 'w', encoding='utf-8') as jsonfile:
+            json.dump(all_prs_data, jsonfile, ensure_ascii=False, indent=4)
+    save_watermarks(SYNC_STATE_FILE, newest_closed_at(all_prs_data))
+    checkpoint.clear()
 
     print("✅ Processo concluído com sucesso!")
 
@@ -0,0 +1,273 @@
+import os
+import statistics
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from rate_limit import TokenPool, scheduler as default_scheduler, with_rate_limit
+from response_cache import operation_name
+from telemetry import telemetry as default_telemetry
+
+try:
+    import httpx  # Opcional: só é necessário para HTTP/2 (pip install "httpx[http2]")
+except ImportError:
+    httpx = None
+
+GITHUB_API_URL = os.environ.get("GITHUB_API_URL", "https://api.github.com/graphql")
+
+# Timeouts (conexão, leitura) em segundos, iguais para todos os coletores
+DEFAULT_TIMEOUT = (10, 60)
+
+# Conexões keep-alive mantidas no pool (deve cobrir a concorrência usada nos coletores)
+DEFAULT_POOL_SIZE = 32
+
+# Status HTTP tratados como falhas transitórias do GitHub
+TRANSIENT_STATUS = {502, 503, 504}
+
+_NETWORK_ERRORS = (requests.exceptions.RequestException,)
+if httpx is not None:
+    _NETWORK_ERRORS += (httpx.TransportError,)
+
+
+class GraphQLRequestError(requests.exceptions.RequestException):
+    """Falha definitiva de uma requisição GraphQL (após esgotar as retentativas)."""
+
+    def __init__(self, message, status_code=None, cause=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.cause = cause
+
+
+class GraphQLAuthError(GraphQLRequestError):
+    """Token inválido ou revogado (401): não adianta tentar novamente."""
+
+
+def _network_cause(error):
+    return "timeout" if "timeout" in type(error).__name__.lower() else "connection"
+
+
+def retry_cause(error):
+    """
+    Causa de uma falha no vocabulário de `RetryPolicy.should_retry` e da
+    telemetria ('502', 'timeout', 'connection', '403', 'graphql'), para que os
+    coletores com laço de retentativa próprio contem as falhas como o cliente.
+    Um GraphQLRequestError de uma tentativa única traz a causa em `.cause`;
+    falhas não transitórias ficam com o status HTTP.
+    """
+    if isinstance(error, GraphQLRequestError):
+        if error.cause is not None:
+            return error.cause
+        return str(error.status_code) if error.status_code else "graphql"
+    if isinstance(error, _NETWORK_ERRORS):
+        return _network_cause(error)
+    # Demais falhas dos coletores: erro GraphQL ou resposta sem os dados esperados
+    return "graphql"
+
+
+class RetryPolicy:
+    """
+    Política de retentativa plugável do cliente.
+
+    Args:
+        max_attempts (int | None): Tentativas no total (None = infinitas).
+        base_wait (float): Espera da primeira retentativa, em segundos.
+        backoff (str): 'constant', 'linear' ou 'exponential'.
+        max_wait (float): Teto da espera entre tentativas.
+    """
+
+    def __init__(self, max_attempts=5, base_wait=2, backoff="exponential", max_wait=120):
+        self.max_attempts = max_attempts
+        self.base_wait = base_wait
+        self.backoff = backoff
+        self.max_wait = max_wait
+
+    def should_retry(self, attempt, cause):
+        """`cause` é um de: '502', 'timeout', 'connection', '403'."""
+        return self.max_attempts is None or attempt < self.max_attempts
+
+    def wait_time(self, attempt):
+        if self.backoff == "constant":
+            wait = self.base_wait
+        elif self.backoff == "linear":
+            wait = self.base_wait * attempt
+        else:
+            wait = self.base_wait * 2 ** (attempt - 1)
+        return min(wait, self.max_wait)
+
+
+class GraphQLClient:
+    """
+    Cliente GraphQL compartilhado pelos coletores: sessão keep-alive com pool
+    de conexões (ou HTTP/2 multiplexado via httpx), timeouts uniformes,
+    retentativas plugáveis e controle do orçamento de rate limit. Com `cache`
+    (ver response_cache.py), respostas já obtidas são servidas do disco sem
+    gastar pontos.
+
+    Com vários tokens (`tokens` ou a variável GITHUB_TOKENS, separados por
+    vírgula), cada requisição usa o token com mais orçamento livre (ver
+    rate_limit.TokenPool) e tokens revogados são descartados.
+    """
+
+    def __init__(self, token="", url=None, timeout=DEFAULT_TIMEOUT, retry_policy=None,
+                 pool_size=DEFAULT_POOL_SIZE, http2=None, scheduler=default_scheduler, cache=None, tokens=None,
+                 telemetry=default_telemetry):
+        self.token = token or os.environ.get("GITHUB_TOKEN", "")
+        if tokens is None:
+            tokens = [t.strip() for t in os.environ.get("GITHUB_TOKENS", "").split(",") if t.strip()]
+        all_tokens = list(dict.fromkeys(([self.token] if self.token else []) + list(tokens))) or [self.token]
+        # Com um único token, o agendador compartilhado do processo continua sendo o dele
+        self.token_pool = TokenPool(all_tokens, {all_tokens[0]: scheduler} if len(all_tokens) == 1 else None)
+        self.url = url or GITHUB_API_URL
+        self.timeout = timeout
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.cache = cache
+        self.telemetry = telemetry
+        self.latencies = deque(maxlen=10000)
+        self._lock = threading.Lock()
+
+        if http2 is None:
+            http2 = os.environ.get("GITHUB_HTTP2") == "1"
+        if http2 and httpx is None:
+            print("⚠️ HTTP/2 solicitado, mas o pacote 'httpx[http2]' não está instalado. Usando HTTP/1.1 com keep-alive.")
+            http2 = False
+        self.http2 = http2
+
+        if self.http2:
+            self._http = httpx.Client(
+                http2=True,
+                timeout=httpx.Timeout(timeout[1], connect=timeout[0]),
+                limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            )
+        else:
+            self._http = requests.Session()
+            self._adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            self._http.mount("https://", self._adapter)
+            self._http.mount("http://", self._adapter)
+
+    def _headers(self, token):
+        return {"Authorization": f"bearer {token}", "Content-Type": "application/json"}
+
+    def post(self, query, variables=None, token=None):
+        """Uma única requisição (sem retentativas), com a latência registrada."""
+        payload = {"query": with_rate_limit(query), "variables": variables or {}}
+        headers = self._headers(self.token if token is None else token)
+        start = time.perf_counter()
+        try:
+            if self.http2:
+                response = self._http.post(self.url, json=payload, headers=headers)
+            else:
+                response = self._http.post(self.url, json=payload, headers=headers, timeout=self.timeout)
+        except _NETWORK_ERRORS:
+            self.telemetry.observe_request(operation_name(query), time.perf_counter() - start, "erro")
+            raise
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.latencies.append(elapsed)
+        self.telemetry.observe_request(operation_name(query), elapsed, response.status_code)
+        return response
+
+    def execute(self, query, variables=None, retry_policy=None):
+        """
+        Executa a query respeitando o orçamento de rate limit e a política de
+        retentativa. Erros GraphQL lógicos (campo `errors` numa resposta 200)
+        são devolvidos junto com o JSON, para que cada coletor decida o que fazer.
+
+        Raises:
+            GraphQLAuthError: Resposta 401.
+            GraphQLRequestError: Falha não transitória ou retentativas esgotadas.
+        """
+        if self.cache is not None:
+            cached = self.cache.get(query, variables)
+            if cached is not None:
+                return cached
+
+        policy = retry_policy or self.retry_policy
+        attempt = 0
+        while True:
+            attempt += 1
+            token = self.token_pool.acquire(query)
+            if token is None:
+                raise GraphQLAuthError("Todos os tokens foram rejeitados (401 Unauthorized).", 401, "401")
+            try:
+                response = self.post(query, variables, token)
+            except _NETWORK_ERRORS as e:
+                self._retry_or_raise(policy, attempt, _network_cause(e), f"{type(e).__name__}: {e}")
+                continue
+
+            status = response.status_code
+            if status == 200:
+                result = response.json()
+                self.token_pool.update(token, result, query)
+                self.telemetry.add_points((((result.get("data") or {}).get("rateLimit")) or {}).get("cost", 0))
+                if self.cache is not None and not result.get("errors"):
+                    self.cache.put(query, variables, result)
+                return result
+
+            self.token_pool.update_from_headers(token, response.headers)
+            if status == 401:
+                dropped = self.token_pool.drop(token)
+                if not len(self.token_pool):
+                    raise GraphQLAuthError("Token de acesso inválido (401 Unauthorized).", status, "401")
+                if dropped:
+                    print(f"  ⚠️ Token ...{token[-4:]} rejeitado (401). Seguindo com {len(self.token_pool)} token(s).")
+                attempt -= 1  # A troca de token não conta como retentativa
+                continue
+            if status == 403 and response.headers.get("X-RateLimit-Remaining") == "0":
+                # O agendador já sabe que o saldo zerou: a próxima tentativa espera até o reset.
+                self._retry_or_raise(policy, attempt, "403", "Rate limit esgotado (403)", wait=False)
+                continue
+            if status == 403 and "Retry-After" in response.headers:
+                self._retry_or_raise(policy, attempt, "403", "Limite secundário (403)",
+                                     wait_seconds=int(response.headers["Retry-After"]))
+                continue
+            if status in TRANSIENT_STATUS:
+                self._retry_or_raise(policy, attempt, "502", f"Erro {status} do servidor")
+                continue
+            raise GraphQLRequestError(f"Erro na requisição: Status Code {status}: {response.text[:500]}", status)
+
+    def _retry_or_raise(self, policy, attempt, cause, message, wait=True, wait_seconds=None):
+        if not policy.should_retry(attempt, cause):
+            raise GraphQLRequestError(f"Query falhou após {attempt} tentativa(s): {message}", cause=cause)
+        self.telemetry.count_retry(cause)
+        if not wait:
+            print(f"  -> Tentativa {attempt}: {message}. Aguardando o reset do orçamento...")
+            return
+        if wait_seconds is None:
+            wait_seconds = policy.wait_time(attempt)
+        print(f"  -> Tentativa {attempt}: {message}. Tentando novamente em {wait_seconds}s...")
+        time.sleep(wait_seconds)
+
+    def connections_opened(self):
+        """Conexões TCP/TLS abertas até agora (só no modo HTTP/1.1 com pool)."""
+        if self.http2:
+            return None
+        pools = self._adapter.poolmanager.pools
+        return sum(pools[key].num_connections for key in pools.keys())
+
+    def latency_stats(self):
+        """Resumo das latências das requisições, para medir o ganho do keep-alive (ver benchmark.py)."""
+        with self._lock:
+            in_order = list(self.latencies)
+        if not in_order:
+            return {"requests": 0, "connections_opened": self.connections_opened()}
+        latencies = sorted(in_order)
+
+        def percentile(fraction):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * fraction))]
+
+        return {
+            "requests": len(latencies),
+            "connections_opened": self.connections_opened(),
+            "first_s": in_order[0],
+            "mean_s": statistics.fmean(latencies),
+            "p50_s": percentile(0.50),
+            "p95_s": percentile(0.95),
+            "p99_s": percentile(0.99),
+            "max_s": latencies[-1],
+        }
+
+    def close(self):
+        self._http.close()
@@ -0,0 +1,440 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from search_partitions import SEARCH_RESULT_CAP
+
+# Orçamento de pontos por token e duração da janela de rate limit do servidor local
+DEFAULT_BUDGET = 5000
+DEFAULT_RESET_SECONDS = 3600
+
+# Campos `search(...)` e `repository(...)` da query, com o alias opcional (queries em lote)
+_ROOT_FIELD = re.compile(r"(?:(\w+)\s*:\s*)?\b(search|repository)\s*\(")
+_ARGUMENT = re.compile(r'(\w+)\s*:\s*("(?:[^"\\]|\\.)*"|\$\w+|[\w-]+)')
+_QUALIFIER_RANGE = re.compile(r"^(>=|<=|>|<)?(.+?)(?:\.\.(.+))?$")
+
+
+# --- DADOS ---
+
+def _parse_time(value):
+    if len(value) == 10:
+        value += "T00:00:00Z"
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def _format_time(moment):
+    return moment.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _pr_from_node(node):
+    """Completa um nó de PR gravado (ex.: rrr.json) com todos os campos que os coletores pedem."""
+    state = node.get("state") or ("MERGED" if node.get("merged") else "CLOSED")
+    return {
+        "url": node.get("url", ""),
+        "number": node["number"],
+        "title": node.get("title", ""),
+        "author": node.get("author"),
+        "state": state,
+        "merged": state == "MERGED",
+        "createdAt": node["createdAt"],
+        "mergedAt": node.get("mergedAt"),
+        "closedAt": node.get("closedAt") or node.get("mergedAt") or node["createdAt"],
+        "additions": node.get("additions", 0),
+        "deletions": node.get("deletions", 0),
+        "changedFiles": node.get("changedFiles", 0),
+        "body": node.get("body") or "",
+        "participants": node.get("participants") or {"totalCount": 1},
+        "comments": node.get("comments") or {"totalCount": 0},
+        "reviewThreads": node.get("reviewThreads") or {"totalCount": 0},
+        "reviews": node.get("reviews") or {"totalCount": 0},
+    }
+
+
+def _pr_from_record(record):
+    """Reconstrói um nó de PR a partir de um registro de dados_pull_requests3.json."""
+    return _pr_from_node({
+        "url": record["pr_url"],
+        "number": record["pr_number"],
+        "title": record["titulo"],
+        "author": None if record["autor"] == "N/A" else {"login": record["autor"]},
+        "state": record["estado"],
+        "createdAt": record["data_criacao"],
+        "closedAt": record["data_fechamento"],
+        "mergedAt": record["data_fechamento"] if record["estado"] == "MERGED" else None,
+        "additions": record["linhas_adicionadas"],
+        "deletions": record["linhas_removidas"],
+        "changedFiles": record["num_arquivos_alterados"],
+        "body": "x" * record["tamanho_descricao_caracteres"],
+        "participants": {"totalCount": record["num_participantes"]},
+        "comments": {"totalCount": record["num_comentarios"]},
+        "reviews": {"totalCount": record["num_revisoes"]},
+    })
+
+
+def load_fixture(path):
+    """
+    Carrega repositórios gravados para o servidor local. Aceita o formato de
+    rrr.json / repo_details.json (um repositório com `pullRequests.nodes` por
+    objeto ou por linha) e o de dados_pull_requests3.json (registros de PRs).
+
+    Returns:
+        dict: nameWithOwner -> repositório no formato de `generate_repositories`.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        data = [json.loads(line) for line in text.splitlines() if line.strip()]
+    if isinstance(data, dict):
+        data = [data]
+
+    repos = {}
+    for item in data:
+        if "repositorio" in item:
+            repo = repos.setdefault(item["repositorio"], {"nameWithOwner": item["repositorio"], "prs": []})
+            repo["prs"].append(_pr_from_record(item))
+        else:
+            nodes = ((item.get("pullRequests") or {}).get("nodes")) or []
+            repo = repos.setdefault(item["nameWithOwner"], {"nameWithOwner": item["nameWithOwner"], "prs": []})
+            repo["prs"] += [_pr_from_node(node) for node in nodes if node and "number" in node]
+
+    for position, repo in enumerate(repos.values()):
+        repo.setdefault("stargazerCount", 100000 - position)
+        repo.setdefault("createdAt", min((pr["createdAt"] for pr in repo["prs"]), default="2015-01-01T00:00:00Z"))
+        repo.setdefault("primaryLanguage", None)
+    return repos
+
+
+def generate_repositories(num_repos=20, prs_per_repo=300, seed=0):
+    """Repositórios sintéticos com PRs fechados/mesclados de tamanhos e datas variados."""
+    rng = random.Random(seed)
+    base = datetime(2016, 1, 1, tzinfo=timezone.utc)
+    languages = ["Python", "JavaScript", "TypeScript", "Go", "Rust", None]
+    repos = {}
+    for r in range(num_repos):
+        name = f"stub-org/repo-{r:03d}"
+        prs = []
+        for number in range(1, prs_per_repo + 1):
+            created = base + timedelta(minutes=rng.randint(0, 8 * 365 * 24 * 60))
+            closed = created + timedelta(minutes=rng.randint(5, 60 * 24 * 60))
+            merged = rng.random() < 0.7
+            prs.append({
+                "url": f"https://github.com/{name}/pull/{number}",
+                "number": number,
+                "title": f"PR {number}",
+                "author": {"login": f"dev{rng.randint(1, 50)}"} if rng.random() > 0.02 else None,
+                "state": "MERGED" if merged else "CLOSED",
+                "merged": merged,
+                "createdAt": _format_time(created),
+                "mergedAt": _format_time(closed) if merged else None,
+                "closedAt": _format_time(closed),
+                "additions": int(rng.lognormvariate(3, 1.5)),
+                "deletions": int(rng.lognormvariate(2, 1.5)),
+                "changedFiles": rng.randint(1, 40),
+                "body": "x" * rng.randint(0, 2000),
+                "participants": {"totalCount": rng.randint(1, 8)},
+                "comments": {"totalCount": rng.randint(0, 20)},
+                "reviewThreads": {"totalCount": rng.randint(0, 10)},
+                "reviews": {"totalCount": rng.choice([0, 1, 1, 2, 3, 5])},
+            })
+        repos[name] = {
+            "nameWithOwner": name,
+            "stargazerCount": 200000 - r * 1000,
+            "createdAt": "2015-01-01T00:00:00Z",
+            "primaryLanguage": {"name": languages[r % len(languages)]} if languages[r % len(languages)] else None,
+            "prs": prs,
+        }
+    return repos
+
+
+# --- BUSCA ---
+
+def _matches_range(value, expression, parse):
+    """Avalia um qualificador de busca como `>=2020-01-01` ou `2020-01-01..2020-02-01`."""
+    operator, low, high = _QUALIFIER_RANGE.match(expression).groups()
+    value = parse(value)
+    if high is not None:
+        return (low == "*" or parse(low) <= value) and (high == "*" or value <= parse(high))
+    bound = parse(low)
+    return {
+        ">=": value >= bound, ">": value > bound, "<=": value <= bound, "<": value < bound, None: value == bound,
+    }[operator]
+
+
+def search_pull_requests(repos, search_query):
+    """PRs que atendem `search_query`, do mais novo para o mais antigo, e o total encontrado."""
+    qualifiers = [term.split(":", 1) for term in search_query.split() if ":" in term]
+    repo_names = [value for key, value in qualifiers if key == "repo"] or list(repos)
+
+    found = []
+    for repo_name in repo_names:
+        for pr in (repos.get(repo_name) or {}).get("prs", []):
+            keep = True
+            for key, value in qualifiers:
+                if key == "created":
+                    keep = _matches_range(pr["createdAt"], value, _parse_time)
+                elif key == "closed":
+                    keep = _matches_range(pr["closedAt"], value, _parse_time)
+                elif key == "reviews":
+                    keep = _matches_range(pr["reviews"]["totalCount"], value, int)
+                elif key == "is" and value == "merged":
+                    keep = pr["merged"]
+                elif key == "is" and value == "unmerged":
+                    keep = not pr["merged"]
+                if not keep:
+                    break
+            if keep:
+                found.append(pr)
+    found.sort(key=lambda pr: pr["createdAt"], reverse=True)
+    return found
+
+
+def _repository_node(repo):
+    return {
+        "nameWithOwner": repo["nameWithOwner"],
+        "stargazerCount": repo["stargazerCount"],
+        "createdAt": repo["createdAt"],
+        "primaryLanguage": repo["primaryLanguage"],
+        "pullRequests": {"totalCount": len(repo["prs"]), "nodes": repo["prs"][:100]},
+    }
+
+
+def _page(items, first, after):
+    start = int(after or 0)
+    end = start + first
+    return items[start:end], {"endCursor": str(min(end, len(items))), "hasNextPage": end < len(items)}
+
+
+# --- SERVIDOR ---
+
+class GitHubStub:
+    """
+    Servidor HTTP local que imita o endpoint GraphQL do GitHub para os
+    coletores: responde às buscas de repositórios e de PRs (inclusive queries
+    em lote com aliases) e a `repository(owner, name)` a partir de repositórios
+    gravados ou gerados. Latência, falhas 502/403 e o orçamento de rate limit
+    (campo `rateLimit` e cabeçalhos X-RateLimit-*) são configuráveis, assim
+    como páginas pesadas: latência extra por PR devolvido e 502 para buscas
+    que pedem mais de `max_page_size` PRs.
+    """
+
+    def __init__(self, repos, latency_ms=0, jitter_ms=0, error_502_rate=0.0, error_403_rate=0.0,
+                 retry_after=1, budget=DEFAULT_BUDGET, reset_seconds=DEFAULT_RESET_SECONDS,
+                 revoked_tokens=(), max_page_size=None, latency_per_node_ms=0, seed=0):
+        self.repos = repos
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_502_rate = error_502_rate
+        self.error_403_rate = error_403_rate
+        self.retry_after = retry_after
+        self.budget = budget
+        self.reset_seconds = reset_seconds
+        self.revoked_tokens = set(revoked_tokens)
+        self.max_page_size = max_page_size
+        self.latency_per_node_ms = latency_per_node_ms
+        self.stats = Counter()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._spent = Counter()
+        self._reset_at = time.time() + reset_seconds
+        self._by_stars = sorted(repos.values(), key=lambda repo: repo["stargazerCount"], reverse=True)
+        self._server = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_port}/graphql"
+
+    def start(self, port=0):
+        """Sobe o servidor numa thread e devolve a URL a usar em GITHUB_API_URL."""
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                token = self.headers.get("Authorization", "").partition(" ")[2]
+                status, headers, payload = stub.handle(token, json.loads(body or b"{}"))
+                out = json.dumps(payload).encode("utf-8") if payload is not None else b""
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, str(value))
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(out)))
+                self.end_headers()
+                self.wfile.write(out)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self.url
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def _rate_limit_headers(self, token):
+        return {
+            "X-RateLimit-Limit": self.budget,
+            "X-RateLimit-Remaining": max(0, self.budget - self._spent[token]),
+            "X-RateLimit-Used": self._spent[token],
+            "X-RateLimit-Reset": int(self._reset_at),
+            "X-RateLimit-Resource": "graphql",
+        }
+
+    def handle(self, token, request):
+        """Processa uma requisição e devolve (status, cabeçalhos, corpo JSON)."""
+        with self._lock:
+            self.stats["requests"] += 1
+            delay = max(0.0, self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+            fault = self._rng.random()
+            if time.time() >= self._reset_at:
+                self._spent.clear()
+                self._reset_at = time.time() + self.reset_seconds
+        time.sleep(delay)
+
+        with self._lock:
+            if token in self.revoked_tokens:
+                self.stats["401"] += 1
+                return 401, {}, {"message": "Bad credentials"}
+            if fault < self.error_502_rate:
+                self.stats["502"] += 1
+                return 502, {}, None
+            if fault < self.error_502_rate + self.error_403_rate:
+                self.stats["403"] += 1
+                return 403, {"Retry-After": self.retry_after}, {"message": "You have exceeded a secondary rate limit."}
+            if self._spent[token] >= self.budget:
+                self.stats["403"] += 1
+                return 403, self._rate_limit_headers(token), {"message": "API rate limit exceeded"}
+            self._spent[token] += 1
+            headers = self._rate_limit_headers(token)
+            remaining = headers["X-RateLimit-Remaining"]
+
+        result = self.execute(request.get("query", ""), request.get("variables") or {})
+        nodes = sum(len(value.get("nodes") or []) for value in result["data"].values() if isinstance(value, dict))
+        if self.max_page_size is not None and result.pop("_largest_page", 0) > self.max_page_size:
+            with self._lock:
+                self.stats["502"] += 1
+            return 502, {}, None
+        result.pop("_largest_page", None)
+        time.sleep(nodes * self.latency_per_node_ms / 1000)
+        if "rateLimit" in request.get("query", ""):
+            result["data"]["rateLimit"] = {
+                "cost": 1, "remaining": remaining, "resetAt": _format_time(datetime.fromtimestamp(self._reset_at, timezone.utc)),
+            }
+        with self._lock:
+            self.stats["200"] += 1
+        return 200, headers, result
+
+    def execute(self, query, variables):
+        """Resolve os campos raiz `search` e `repository` da query."""
+        data, errors = {}, []
+        largest_page = 0
+        for match in _ROOT_FIELD.finditer(query):
+            alias, field = match.group(1) or match.group(2), match.group(2)
+            arguments = {}
+            for name, raw in _ARGUMENT.findall(_arguments_text(query, match.end() - 1)):
+                if raw.startswith("$"):
+                    arguments[name] = variables.get(raw[1:])
+                elif raw.startswith('"'):
+                    arguments[name] = json.loads(raw)
+                else:
+                    arguments[name] = int(raw) if raw.isdigit() else raw
+
+            if field == "repository":
+                repo = self.repos.get(f"{arguments.get('owner')}/{arguments.get('name')}")
+                data[alias] = _repository_node(repo) if repo else None
+                if repo is None:
+                    errors.append({
+                        "type": "NOT_FOUND", "path": [alias],
+                        "message": f"Could not resolve to a Repository with the name "
+                                   f"'{arguments.get('owner')}/{arguments.get('name')}'.",
+                    })
+                continue
+
+            first = arguments.get("first") or 10
+            if arguments.get("type") == "REPOSITORY":
+                nodes, page_info = _page(self._by_stars, first, arguments.get("after"))
+                data[alias] = {
+                    "repositoryCount": len(self._by_stars),
+                    "pageInfo": page_info,
+                    "nodes": [_repository_node(repo) for repo in nodes],
+                }
+            else:
+                found = search_pull_requests(self.repos, arguments.get("query") or "")
+                nodes, page_info = _page(found[:SEARCH_RESULT_CAP], first, arguments.get("after"))
+                data[alias] = {"issueCount": len(found), "pageInfo": page_info, "nodes": nodes}
+                largest_page = max(largest_page, first)
+
+        result = {"data": data, "_largest_page": largest_page}
+        if errors:
+            result["errors"] = errors
+        return result
+
+
+def _arguments_text(query, open_paren):
+    """Texto entre o parêntese em `open_paren` e o que o fecha (ignorando strings)."""
+    depth, in_string, escaped = 0, False, False
+    for position in range(open_paren, len(query)):
+        char = query[position]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth == 0:
+                return query[open_paren + 1:position]
+    return query[open_paren + 1:]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Servidor local que imita a API GraphQL do GitHub para testar e medir os coletores.")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--fixture", help="Arquivo gravado (rrr.json, repo_details.json ou dados_pull_requests3.json).")
+    parser.add_argument("--repositorios", type=int, default=20, help="Repositórios gerados quando não há --fixture.")
+    parser.add_argument("--prs", type=int, default=300, help="PRs gerados por repositório quando não há --fixture.")
+    parser.add_argument("--latencia-ms", type=float, default=0, help="Latência média de cada resposta.")
+    parser.add_argument("--variacao-ms", type=float, default=0, help="Variação aleatória (±) da latência.")
+    parser.add_argument("--taxa-502", type=float, default=0.0, help="Fração das requisições respondidas com 502.")
+    parser.add_argument("--taxa-403", type=float, default=0.0, help="Fração respondida com 403 de limite secundário.")
+    parser.add_argument("--orcamento", type=int, default=DEFAULT_BUDGET, help="Pontos por token a cada janela.")
+    parser.add_argument("--pagina-maxima", type=int, help="Buscas de PRs com `first` acima disto recebem 502.")
+    parser.add_argument("--latencia-por-pr-ms", type=float, default=0, help="Latência extra por PR devolvido.")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    repos = load_fixture(args.fixture) if args.fixture else generate_repositories(args.repositorios, args.prs)
+    stub = GitHubStub(
+        repos, latency_ms=args.latencia_ms, jitter_ms=args.variacao_ms, error_502_rate=args.taxa_502,
+        error_403_rate=args.taxa_403, budget=args.orcamento, max_page_size=args.pagina_maxima,
+        latency_per_node_ms=args.latencia_por_pr_ms)
+    url = stub.start(args.porta)
+    print(f"Servidor local com {len(repos)} repositório(s) em {url}")
+    print(f"Use: GITHUB_API_URL={url} python getReposDetails.py")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        stub.stop()
@@ -0,0 +1,48 @@
+import json
+
+# Prefixo dos aliases usados para empacotar vários campos raiz numa só query.
+ALIAS_PREFIX = "r"
+
+
+def alias_for(index):
+    return f"{ALIAS_PREFIX}{index}"
+
+
+def graphql_string(value):
+    """Literal de string GraphQL (o escape de JSON é compatível com o de GraphQL)."""
+    return json.dumps(value, ensure_ascii=False)
+
+
+def chunked(items, size):
+    """Divide `items` em listas consecutivas de no máximo `size` elementos."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def build_batched_query(operation_name, selections, fragments=""):
+    """
+    Monta um documento GraphQL com um campo raiz por item, cada um sob o alias
+    `r<i>` (na ordem de `selections`). `fragments` é anexado após a operação.
+    """
+    body = "\n".join(f"  {alias_for(i)}: {selection}" for i, selection in enumerate(selections))
+    return f"query {operation_name} {{\n{body}\n}}\n{fragments}"
+
+
+def split_batched_response(result, count):
+    """
+    Separa a resposta de `build_batched_query` de volta por item.
+
+    Returns:
+        list: Para cada item, o dado do seu alias, ou None se ele veio nulo,
+              faltou na resposta ou teve erro GraphQL associado ao seu path.
+    """
+    data = (result or {}).get("data") or {}
+    failed_aliases = {
+        error["path"][0]
+        for error in (result or {}).get("errors") or []
+        if error.get("path")
+    }
+    return [
+        None if alias_for(i) in failed_aliases else data.get(alias_for(i))
+        for i in range(count)
+    ]
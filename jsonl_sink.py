@@ -0,0 +1,81 @@
+import json
+import os
+import threading
+import time
+
+# Tamanho do buffer de escrita do arquivo (bytes)
+WRITE_BUFFER_BYTES = 1 << 20
+
+
+class JsonlSink:
+    """
+    Saída em JSON Lines: cada registro vira uma linha assim que sua página
+    chega, sem acumular o conjunto de dados em memória.
+
+    As linhas passam pelo buffer do arquivo e são descarregadas em disco a cada
+    `flush_every` registros ou `flush_interval` segundos (o que vier antes), de
+    modo que um leitor (ver `read_jsonl`) acompanha o arquivo ainda em escrita.
+    """
+
+    def __init__(self, path, mode='w', flush_every=500, flush_interval=2.0):
+        self.path = path
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.records_written = 0
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._file = open(path, mode, encoding='utf-8', buffering=WRITE_BUFFER_BYTES)
+
+    def write(self, records):
+        """Escreve uma página (ou qualquer lista) de registros."""
+        if not records:
+            return
+        lines = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records)
+        with self._lock:
+            self._file.write(lines)
+            self.records_written += len(records)
+            self._pending += len(records)
+            if self._pending >= self.flush_every or time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def sync(self):
+        """Grava o buffer em disco (com fsync) e devolve o tamanho do arquivo em bytes."""
+        with self._lock:
+            self._flush_locked()
+            os.fsync(self._file.fileno())
+            return os.fstat(self._file.fileno()).st_size
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._flush_locked()
+                self._file.close()
+
+    def _flush_locked(self):
+        self._file.flush()
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def read_jsonl(path):
+    """
+    Lê um arquivo JSON Lines registro a registro. Uma última linha incompleta
+    (arquivo ainda sendo escrito) é ignorada em vez de gerar erro.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.endswith('\n'):
+                break
+            if line.strip():
+                yield json.loads(line)
@@ -0,0 +1,139 @@
+from datetime import datetime
+
+try:
+    import numpy as np  # Opcional: sem numpy, a normalização cai no laço por PR
+except ImportError:
+    np = None
+
+# Campos do registro salvo em OUTPUT_JSON_FILE, na ordem em que são gravados
+PR_FIELDS = (
+    'repositorio', 'pr_number', 'pr_url', 'titulo', 'autor', 'estado',
+    'data_criacao', 'data_fechamento', 'tempo_analise_dias',
+    'num_arquivos_alterados', 'linhas_adicionadas', 'linhas_removidas',
+    'tamanho_descricao_caracteres', 'num_participantes', 'num_comentarios', 'num_revisoes',
+)
+
+SECONDS_PER_DAY = 86400
+
+# Distância de um empate (…,5 na terceira casa) a partir da qual o arredondamento
+# vetorizado pode divergir do `round` do Python; esses casos são refeitos um a um
+_TIE_TOLERANCE = 1e-6
+
+
+def normalize_pr(pr, repo_full_name):
+    """Converte um nó PullRequest da API no registro salvo em OUTPUT_JSON_FILE."""
+    created_at = datetime.fromisoformat(pr['createdAt'].replace('Z', '+00:00'))
+    closed_at = datetime.fromisoformat(pr['closedAt'].replace('Z', '+00:00'))
+    tempo_analise_delta = closed_at - created_at
+    num_comentarios_total = pr['comments']['totalCount'] + pr['reviewThreads']['totalCount']
+
+    return {
+        'repositorio': repo_full_name,
+        'pr_number': pr['number'],
+        'pr_url': pr['url'],
+        'titulo': pr['title'],
+        'autor': (pr.get('author') or {}).get('login', 'N/A'),
+        'estado': 'MERGED' if pr['merged'] else 'CLOSED',
+        'data_criacao': pr['createdAt'],
+        'data_fechamento': pr['closedAt'],
+        'tempo_analise_dias': round(tempo_analise_delta.total_seconds() / SECONDS_PER_DAY, 2),
+        'num_arquivos_alterados': pr['changedFiles'],
+        'linhas_adicionadas': pr['additions'],
+        'linhas_removidas': pr['deletions'],
+        'tamanho_descricao_caracteres': len(pr.get('body', '') or ''),
+        'num_participantes': pr['participants']['totalCount'],
+        'num_comentarios': num_comentarios_total,
+        'num_revisoes': pr['reviews']['totalCount'],
+    }
+
+
+def _parse_timestamps(values):
+    """Timestamps ISO 8601 da API ('2024-01-31T12:00:00Z') como datetime64[s], de uma vez."""
+    # Como bytes de 19 posições o sufixo 'Z' (fuso que o numpy não aceita) é
+    # truncado na própria conversão, bem mais rápida que a de strings unicode
+    return np.array(values, dtype='S19').astype('datetime64[s]')
+
+
+def _round_days(days):
+    """Arredonda para 2 casas exatamente como `round(x, 2)` do Python."""
+    scaled = days * 100
+    rounded = np.round(scaled) / 100
+    # Perto de um empate o produto por 100 pode ter cruzado o meio; o `round`
+    # do Python decide pelo valor decimal exato, então esses poucos são refeitos
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < _TIE_TOLERANCE
+    for i in np.flatnonzero(near_tie):
+        rounded[i] = round(float(days[i]), 2)
+    return rounded
+
+
+def _int_column(values):
+    return np.array(values, dtype=np.int64)
+
+
+def normalize_columns(nodes, repo_full_name):
+    """
+    Converte os nós PullRequest de uma ou mais páginas em colunas tipadas
+    (arrays do numpy indexados pelos nomes de PR_FIELDS). Nós nulos ou
+    inacessíveis são descartados.
+
+    O tempo de análise é calculado sobre a coluna inteira de timestamps,
+    sem objetos datetime por PR.
+    """
+    nodes = [pr for pr in nodes if pr]
+    created = [pr['createdAt'] for pr in nodes]
+    closed = [pr['closedAt'] for pr in nodes]
+    duration = (_parse_timestamps(closed) - _parse_timestamps(created)).astype(np.int64)
+
+    return {
+        'repositorio': np.full(len(nodes), repo_full_name, dtype=object),
+        'pr_number': _int_column([pr['number'] for pr in nodes]),
+        'pr_url': np.array([pr['url'] for pr in nodes], dtype=object),
+        'titulo': np.array([pr['title'] for pr in nodes], dtype=object),
+        'autor': np.array([author.get('login', 'N/A') if (author := pr.get('author')) else 'N/A'
+                           for pr in nodes], dtype=object),
+        'estado': np.where(np.array([pr['merged'] for pr in nodes], dtype=bool),
+                           'MERGED', 'CLOSED').astype(object),
+        'data_criacao': np.array(created, dtype=object),
+        'data_fechamento': np.array(closed, dtype=object),
+        'tempo_analise_dias': _round_days(duration / SECONDS_PER_DAY),
+        'num_arquivos_alterados': _int_column([pr['changedFiles'] for pr in nodes]),
+        'linhas_adicionadas': _int_column([pr['additions'] for pr in nodes]),
+        'linhas_removidas': _int_column([pr['deletions'] for pr in nodes]),
+        'tamanho_descricao_caracteres': _int_column([len(pr.get('body') or '') for pr in nodes]),
+        'num_participantes': _int_column([pr['participants']['totalCount'] for pr in nodes]),
+        'num_comentarios': (_int_column([pr['comments']['totalCount'] for pr in nodes])
+                            + _int_column([pr['reviewThreads']['totalCount'] for pr in nodes])),
+        'num_revisoes': _int_column([pr['reviews']['totalCount'] for pr in nodes]),
+    }
+
+
+def columns_to_records(columns):
+    """Registros (dicts com os campos de PR_FIELDS, em ordem) a partir das colunas."""
+    # `tolist` devolve int/float/str nativos, serializáveis em JSON como antes; o
+    # dict literal (mesma ordem de PR_FIELDS) monta cada registro sem `zip` por linha
+    return [
+        {
+            'repositorio': repositorio, 'pr_number': pr_number, 'pr_url': pr_url, 'titulo': titulo,
+            'autor': autor, 'estado': estado, 'data_criacao': data_criacao,
+            'data_fechamento': data_fechamento, 'tempo_analise_dias': tempo_analise_dias,
+            'num_arquivos_alterados': num_arquivos_alterados, 'linhas_adicionadas': linhas_adicionadas,
+            'linhas_removidas': linhas_removidas, 'tamanho_descricao_caracteres': tamanho_descricao_caracteres,
+            'num_participantes': num_participantes, 'num_comentarios': num_comentarios, 'num_revisoes': num_revisoes,
+        }
+        for (repositorio, pr_number, pr_url, titulo, autor, estado, data_criacao, data_fechamento,
+             tempo_analise_dias, num_arquivos_alterados, linhas_adicionadas, linhas_removidas,
+             tamanho_descricao_caracteres, num_participantes, num_comentarios, num_revisoes)
+        in zip(*(columns[field].tolist() for field in PR_FIELDS))
+    ]
+
+
+def normalize_page(nodes, repo_full_name):
+    """
+    Normaliza os nós de uma página (ou de várias páginas concatenadas) nos
+    mesmos registros de `normalize_pr`, campo a campo. Nós nulos são descartados.
+    """
+    if np is None:
+        return [normalize_pr(pr, repo_full_name) for pr in nodes if pr]
+    if not any(nodes):
+        return []
+    return columns_to_records(normalize_columns(nodes, repo_full_name))
@@ -0,0 +1,292 @@
+import argparse
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import NamedTuple
+
+# Hashes das entradas de cada estágio na última execução bem-sucedida
+PIPELINE_STATE_FILE = ".pipeline_estado.json"
+
+# Estágios rodando ao mesmo tempo, no máximo
+DEFAULT_PARALLELISM = 3
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# Conjunto de dados das análises: o JSON da coleta ou o Parquet de --formato parquet.
+# Com o JSON, as próprias análises gravam uma cópia Parquet dele (pr_dataset.py);
+# essa cópia é derivada e não entra no hash, senão a segunda execução recalcularia tudo.
+DATASET_FILES = ("dados_pull_requests3.json", "dados_pull_requests3.parquet")
+
+
+class Stage(NamedTuple):
+    """
+    Um estágio do pipeline: um script do projeto, os arquivos que ele lê e os
+    que ele grava. As dependências entre estágios saem dos próprios arquivos:
+    um estágio depende de quem grava alguma das suas entradas.
+    """
+    name: str
+    script: str
+    inputs: tuple = ()
+    outputs: tuple = ()
+    args: tuple = ()
+
+
+STAGES = (
+    Stage("descoberta", "getRepos2.py",
+          outputs=("repositorios_filtrados_em_lotes2.json",)),
+    Stage("detalhes", "getReposDetails.py",
+          inputs=("repositorios_filtrados_em_lotes2.json",),
+          outputs=(DATASET_FILES[0],)),
+    Stage("analise_pull_requests", "analise_pull_requests.py",
+          inputs=(DATASET_FILES[0],),
+          outputs=tuple(f"{name}.png" for name in (
+              "01_distribuicoes_log", "02_merged_vs_closed_log", "03_series_temporais",
+              "04_correlacao_spearman", "05_regressao_revisoes_log", "06_densidades_comparativas",
+              "07_analise_quantis", "08_heatmap_comparativo")) + ("estatisticas_por_grupo.csv",)),
+    Stage("analise", "analise.py",
+          inputs=(DATASET_FILES[0],),
+          outputs=("09_DIMENSAO_A_completa.png", "10_DIMENSAO_B_completa.png", "11_PANORAMA_GERAL_RQs.png")),
+    Stage("relatorio", "relatorio.py",
+          inputs=(DATASET_FILES[0],),
+          outputs=("RELATORIO_ANALISE_PRS.md",)),
+)
+
+
+def stages_for_format(dataset_format, stages=STAGES):
+    """
+    Estágios com a coleta gravando o conjunto de dados em `dataset_format`
+    ('json' ou 'parquet'): as análises passam a ler o arquivo desse formato.
+    """
+    if dataset_format == "json":
+        return stages
+    dataset = DATASET_FILES[1]
+    formatted = []
+    for stage in stages:
+        if stage.name == "detalhes":
+            stage = stage._replace(args=("--formato", dataset_format), outputs=(dataset,))
+        elif DATASET_FILES[0] in stage.inputs:
+            stage = stage._replace(inputs=tuple(dataset if path == DATASET_FILES[0] else path
+                                                for path in stage.inputs))
+        formatted.append(stage)
+    return tuple(formatted)
+
+
+# --- HASH DAS ENTRADAS ---
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def local_modules(script):
+    """O script e os módulos do projeto que ele importa, direta ou indiretamente."""
+    found, pending = set(), [script]
+    while pending:
+        path = pending.pop()
+        if path in found:
+            continue
+        found.add(path)
+        with open(os.path.join(PROJECT_DIR, path), "r", encoding="utf-8") as f:
+            tree = ast.parse(f.read(), filename=path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                module_path = f"{name.split('.')[0]}.py"
+                if os.path.exists(os.path.join(PROJECT_DIR, module_path)):
+                    pending.append(module_path)
+    return sorted(found)
+
+
+def stage_fingerprint(stage):
+    """
+    Hash do conteúdo de tudo o que determina a saída do estágio: o código
+    (script e módulos locais), os argumentos e os arquivos de entrada.
+    Devolve None se alguma entrada ainda não existe.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps(stage.args).encode("utf-8"))
+    for path in local_modules(stage.script):
+        digest.update(f"codigo:{path}:{_file_digest(os.path.join(PROJECT_DIR, path))}".encode("utf-8"))
+    for path in stage.inputs:
+        if not os.path.exists(path):
+            return None
+        digest.update(f"entrada:{path}:{_file_digest(path)}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def load_state(path=PIPELINE_STATE_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_state(state, path=PIPELINE_STATE_FILE):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+# --- GRAFO ---
+
+def upstream_stages(stages):
+    """Para cada estágio, os estágios que gravam alguma das suas entradas."""
+    producers = {output: stage.name for stage in stages for output in stage.outputs}
+    return {
+        stage.name: sorted({producers[path] for path in stage.inputs if path in producers} - {stage.name})
+        for stage in stages
+    }
+
+
+def is_cached(stage, state, fingerprint):
+    return (fingerprint is not None and state.get(stage.name) == fingerprint
+            and all(os.path.exists(path) for path in stage.outputs))
+
+
+def explain(stages, state, forced=()):
+    """
+    Situação de cada estágio sem executar nada: 'em cache', 'recalcula'
+    (com o motivo) ou 'aguarda' um estágio anterior que será recalculado.
+    """
+    upstream = upstream_stages(stages)
+    will_run, lines = set(), []
+    for stage in stages:
+        pending = [name for name in upstream[stage.name] if name in will_run]
+        fingerprint = stage_fingerprint(stage)
+        if pending:
+            status = f"aguarda {', '.join(pending)} (recalcula se a entrada mudar)"
+        elif stage.name in forced:
+            status = "recalcula: forçado"
+        elif fingerprint is None:
+            missing = [path for path in stage.inputs if not os.path.exists(path)]
+            status = f"recalcula: entrada ausente ({', '.join(missing)})"
+        elif is_cached(stage, state, fingerprint):
+            status = "em cache"
+        elif stage.name not in state:
+            status = "recalcula: nunca executado"
+        elif state[stage.name] != fingerprint:
+            status = "recalcula: código ou entradas mudaram"
+        else:
+            status = "recalcula: saída ausente"
+
+        if status != "em cache":
+            will_run.add(stage.name)
+        lines.append(f"  {stage.name:<24} {status}")
+    return lines
+
+
+# --- EXECUÇÃO ---
+
+def run_stage(stage):
+    """Roda o script do estágio num processo separado; devolve (sucesso, saída)."""
+    env = dict(os.environ, MPLBACKEND="Agg")  # Figuras sem janela, também em paralelo
+    result = subprocess.run([sys.executable, os.path.join(PROJECT_DIR, stage.script), *stage.args],
+                            capture_output=True, text=True, env=env)
+    return result.returncode == 0, result.stdout + result.stderr
+
+
+def run_pipeline(stages, forced=(), parallelism=DEFAULT_PARALLELISM, state_path=PIPELINE_STATE_FILE):
+    """
+    Executa os estágios em ordem de dependência, pulando os que estão em
+    cache; estágios independentes (como os três scripts de análise) rodam
+    ao mesmo tempo. O hash de um estágio só é calculado quando ele fica
+    pronto, já com as saídas novas dos estágios anteriores.
+
+    Returns:
+        bool: True se nenhum estágio falhou.
+    """
+    state = load_state(state_path)
+    upstream = upstream_stages(stages)
+    done, failed, started, running = set(), set(), set(), {}
+
+    def start_ready(executor):
+        for stage in stages:
+            name = stage.name
+            if name in done or name in failed or name in started:
+                continue
+            if any(dep in failed for dep in upstream[name]):
+                print(f"⏭️  {name}: pulado (estágio anterior falhou)")
+                failed.add(name)
+                continue
+            if not all(dep in done for dep in upstream[name]):
+                continue
+            fingerprint = stage_fingerprint(stage)
+            if name not in forced and is_cached(stage, state, fingerprint):
+                print(f"✓ {name}: em cache")
+                done.add(name)
+                continue
+            print(f"▶️  {name}: executando {stage.script}...", flush=True)
+            started.add(name)
+            running[executor.submit(run_stage, stage)] = (name, fingerprint)
+
+    with ThreadPoolExecutor(max_workers=parallelism) as executor:
+        while True:
+            previous = len(done) + len(failed)
+            start_ready(executor)
+            if not running:
+                if len(done) + len(failed) == previous:
+                    break
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name, fingerprint = running.pop(future)
+                success, output = future.result()
+                if output.strip():
+                    print(f"\n----- {name} -----\n{output.rstrip()}\n")
+                if success:
+                    # Guarda o hash das entradas como estavam ao iniciar o estágio
+                    if fingerprint is not None:
+                        state[name] = fingerprint
+                        save_state(state, state_path)
+                    print(f"✅ {name}: concluído")
+                    done.add(name)
+                else:
+                    print(f"❌ {name}: falhou")
+                    failed.add(name)
+
+    return not failed
+
+
+def parse_args():
+    names = [stage.name for stage in STAGES]
+    parser = argparse.ArgumentParser(
+        description="Executa o pipeline completo (descoberta → detalhes → análises), "
+                    "pulando estágios cujas entradas não mudaram.")
+    parser.add_argument("--explain", "--explicar", action="store_true",
+                        help="Só mostra quais estágios estão em cache e quais serão recalculados.")
+    parser.add_argument("--forcar", nargs="+", choices=names, default=[],
+                        help="Estágios a recalcular mesmo em cache (a coleta depende da API, não só dos arquivos).")
+    parser.add_argument("--paralelismo", type=int, default=DEFAULT_PARALLELISM,
+                        help="Estágios independentes rodando ao mesmo tempo.")
+    parser.add_argument("--formato", choices=["json", "parquet"], default="json",
+                        help="Formato em que a coleta grava o conjunto de dados (ver getReposDetails.py).")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    stages = stages_for_format(args.formato)
+    if args.explain:
+        print("Situação dos estágios:")
+        print("\n".join(explain(stages, load_state(), args.forcar)))
+        return
+    if not run_pipeline(stages, args.forcar, args.paralelismo):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
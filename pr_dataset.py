@@ -0,0 +1,388 @@
+import hashlib
+import json
+import os
+
+try:
+    import pyarrow as pa  # Opcional: sem pyarrow, o conjunto de dados fica só em JSON
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pc = pq = None
+
+DATASET_JSON_FILE = "dados_pull_requests3.json"
+DATASET_PARQUET_FILE = "dados_pull_requests3.parquet"
+
+# Formato dos timestamps da API (sempre em UTC)
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+# Colunas de texto repetidas entre PRs, gravadas com codificação de dicionário
+DICTIONARY_COLUMNS = ("repositorio", "autor", "estado")
+TIMESTAMP_COLUMNS = ("data_criacao", "data_fechamento")
+
+PARQUET_COMPRESSION = "zstd"
+
+
+def _schema():
+    text = pa.dictionary(pa.int32(), pa.string())
+    timestamp = pa.timestamp("s", tz="UTC")
+    return pa.schema([
+        ("repositorio", text),
+        ("pr_number", pa.int64()),
+        ("pr_url", pa.string()),
+        ("titulo", pa.string()),
+        ("autor", text),
+        ("estado", text),
+        ("data_criacao", timestamp),
+        ("data_fechamento", timestamp),
+        ("tempo_analise_dias", pa.float64()),
+        ("num_arquivos_alterados", pa.int32()),
+        ("linhas_adicionadas", pa.int64()),
+        ("linhas_removidas", pa.int64()),
+        ("tamanho_descricao_caracteres", pa.int32()),
+        ("num_participantes", pa.int32()),
+        ("num_comentarios", pa.int32()),
+        ("num_revisoes", pa.int32()),
+    ])
+
+
+def parquet_available():
+    return pa is not None
+
+
+def arrow_table(records):
+    """Tabela Arrow tipada dos registros de PR (timestamps convertidos de uma vez por coluna)."""
+    schema = _schema()
+    columns = {}
+    for field in schema:
+        values = [record.get(field.name) for record in records]
+        if field.name in TIMESTAMP_COLUMNS:
+            parsed = pc.strptime(pa.array(values, pa.string()), format=TIMESTAMP_FORMAT, unit="s")
+            columns[field.name] = parsed.cast(field.type)
+        else:
+            columns[field.name] = pa.array(values, field.type)
+    return pa.table(columns, schema=schema)
+
+
+def write_parquet(records, path=DATASET_PARQUET_FILE):
+    """Grava os registros em Parquet (atomicamente), com dicionário nas colunas de texto repetidas."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"  # As análises podem converter o JSON ao mesmo tempo
+    pq.write_table(arrow_table(records), tmp_path, compression=PARQUET_COMPRESSION,
+                   use_dictionary=list(DICTIONARY_COLUMNS))
+    os.replace(tmp_path, path)
+
+
+def read_parquet_table(path=DATASET_PARQUET_FILE):
+    """
+    Tabela Arrow do Parquet com os tipos de `_schema`. O Parquet não tem
+    timestamps em segundos: eles são gravados em ms e voltam para segundos aqui.
+    """
+    table = pq.read_table(path)
+    for name in TIMESTAMP_COLUMNS:
+        position = table.schema.get_field_index(name)
+        table = table.set_column(position, name, table[name].cast(pa.timestamp("s", tz="UTC")))
+    return table
+
+
+def read_parquet_records(path=DATASET_PARQUET_FILE):
+    """Registros do Parquet no mesmo formato de dados_pull_requests3.json (timestamps em ISO 8601)."""
+    table = read_parquet_table(path)
+    for name in TIMESTAMP_COLUMNS:
+        position = table.schema.get_field_index(name)
+        table = table.set_column(position, name, pc.strftime(table[name], format=TIMESTAMP_FORMAT))
+    return table.to_pylist()
+
+
+def parquet_round_trip_differences(records, path):
+    """
+    Grava `records` com `write_parquet`, lê de volta com `read_parquet_records`
+    e devolve as diferenças encontradas (lista vazia se a ida e volta preserva
+    todos os campos do esquema, inclusive nulos e timestamps).
+    """
+    write_parquet(records, path)
+    read_back = read_parquet_records(path)
+    if len(read_back) != len(records):
+        return [f"{len(records)} registros gravados, {len(read_back)} lidos"]
+    differences = []
+    for position, (original, loaded) in enumerate(zip(records, read_back)):
+        for field in _schema():
+            if original.get(field.name) != loaded[field.name]:
+                differences.append(f"registro {position}, {field.name}: "
+                                   f"{original.get(field.name)!r} != {loaded[field.name]!r}")
+    return differences
+
+
+def _sample_records():
+    """Registros sintéticos (ver github_stub.py), com autores ausentes e descrições vazias."""
+    from github_stub import generate_repositories
+    from page_normalizer import normalize_page
+
+    records = []
+    for name, repo in generate_repositories(num_repos=3, prs_per_repo=200).items():
+        records.extend(normalize_page(repo["prs"], name))
+    records[0]["tamanho_descricao_caracteres"] = None  # Campo nulo também precisa sobreviver
+    return records
+
+
+def _plain_strings(table):
+    """Decodifica as colunas de dicionário para strings comuns, como no DataFrame vindo do JSON."""
+    for position, field in enumerate(table.schema):
+        if pa.types.is_dictionary(field.type):
+            table = table.set_column(position, field.name, table[field.name].cast(pa.string()))
+    return table
+
+
+def _parquet_is_stale(json_path, parquet_path):
+    """True se o Parquet não existe ou é mais antigo que o JSON."""
+    if not os.path.exists(parquet_path):
+        return True
+    return os.path.exists(json_path) and os.path.getmtime(parquet_path) < os.path.getmtime(json_path)
+
+
+def load_pr_dataframe(json_path=DATASET_JSON_FILE, parquet_path=DATASET_PARQUET_FILE):
+    """
+    Carrega o conjunto de PRs num DataFrame do pandas, preferindo o Parquet.
+
+    O Parquet é usado quando existe e não é mais antigo que o JSON; se só o
+    JSON estiver atualizado, ele é lido uma vez e convertido, para que as
+    próximas cargas já venham do Parquet. Sem pyarrow, lê o JSON como antes.
+    Do Parquet, as datas já chegam como datetime (UTC).
+    """
+    import pandas as pd
+
+    if pa is not None and not _parquet_is_stale(json_path, parquet_path):
+        return _plain_strings(read_parquet_table(parquet_path)).to_pandas()
+
+    with open(json_path, "r", encoding="utf-8") as f:
+        records = json.load(f)
+    if pa is None:
+        return pd.DataFrame(records)
+
+    write_parquet(records, parquet_path)
+    print(f"✓ Cópia colunar gravada em '{parquet_path}' (próximas cargas serão mais rápidas).")
+    return _plain_strings(arrow_table(records)).to_pandas()
+
+
+# --- CONJUNTO PREPARADO PARA AS ANÁLISES ---
+
+# Cache binário do DataFrame preparado, endereçado pelo hash do arquivo de origem
+PREPARED_CACHE_DIR = os.environ.get("PR_ANALYSIS_CACHE_DIR", ".cache_analise")
+
+# Mude ao alterar `prepare_dataframe`, para invalidar os caches antigos
+PREPARED_VERSION = 1
+
+_MANIFEST_FILE = "manifesto.json"
+
+
+def prepare_dataframe(df):
+    """Colunas derivadas usadas pelas análises (datas, tamanho total, estado numérico, período e logs)."""
+    import numpy as np
+    import pandas as pd
+
+    df['data_criacao'] = pd.to_datetime(df['data_criacao'])
+    df['data_fechamento'] = pd.to_datetime(df['data_fechamento'])
+    df['tamanho_total_linhas'] = df['linhas_adicionadas'] + df['linhas_removidas']
+    df['estado_numerico'] = (df['estado'] == 'MERGED').astype(int)
+    df['ano'] = df['data_criacao'].dt.year
+    df['mes'] = df['data_criacao'].dt.month
+    df['ano_mes'] = df['data_criacao'].dt.to_period('M')
+    # +1 para permitir log (evitar log(0))
+    df['tamanho_total_linhas_log'] = np.log1p(df['tamanho_total_linhas'])
+    df['tempo_analise_dias_log'] = np.log1p(df['tempo_analise_dias'])
+    df['num_comentarios_log'] = np.log1p(df['num_comentarios'])
+    df['num_revisoes_log'] = np.log1p(df['num_revisoes'])
+    return df
+
+
+def _source_digest(path, cache_dir):
+    """
+    sha256 do arquivo de origem. O hash fica anotado no manifesto do cache
+    junto com tamanho e data de modificação, e só é recalculado quando eles
+    mudam; assim uma carga em cache não precisa reler o arquivo inteiro.
+    """
+    manifest_path = os.path.join(cache_dir, _MANIFEST_FILE)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+
+    stat = os.stat(path)
+    entry = manifest.get(os.path.abspath(path))
+    if entry and entry["tamanho"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+        return entry["sha256"]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    manifest[os.path.abspath(path)] = {
+        "tamanho": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest.hexdigest()}
+    tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+    return digest.hexdigest()
+
+
+def load_prepared_dataframe(json_path=DATASET_JSON_FILE, parquet_path=DATASET_PARQUET_FILE,
+                            cache_dir=PREPARED_CACHE_DIR, compact=None, drop_text=False):
+    """
+    DataFrame do conjunto de PRs já com as colunas de `prepare_dataframe`.
+
+    Na primeira carga de um arquivo de origem (o Parquet ou o JSON mais
+    recente) o DataFrame é preparado e gravado em pickle no cache, com o hash
+    do conteúdo da origem no nome; as cargas seguintes só leem o pickle.
+    Caches de versões anteriores da origem são removidos.
+
+    Com `compact` (padrão: variável de ambiente PR_ANALISE_COMPACTA=1), o
+    DataFrame devolvido passa por `compact_dataframe` e a economia de memória
+    por coluna é impressa.
+    """
+    import pandas as pd
+
+    os.makedirs(cache_dir, exist_ok=True)
+    if pa is not None and _parquet_is_stale(json_path, parquet_path):
+        # Converte antes de calcular a chave, para que as próximas cargas usem a mesma origem
+        with open(json_path, "r", encoding="utf-8") as f:
+            write_parquet(json.load(f), parquet_path)
+    source = parquet_path if pa is not None else json_path
+    key = f"{_source_digest(source, cache_dir)[:16]}_v{PREPARED_VERSION}"
+    cache_path = os.path.join(cache_dir, f"prs_preparados_{key}.pkl")
+
+    if compact is None:
+        compact = os.environ.get("PR_ANALISE_COMPACTA") == "1"
+
+    if os.path.exists(cache_path):
+        return _maybe_compact(pd.read_pickle(cache_path), compact, drop_text)
+
+    df = prepare_dataframe(load_pr_dataframe(json_path, parquet_path))
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    df.to_pickle(tmp_path)
+    os.replace(tmp_path, cache_path)
+    for entry in os.scandir(cache_dir):
+        if entry.name.startswith("prs_preparados_") and entry.name.endswith(".pkl") and entry.path != cache_path:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass  # Outra análise rodando ao mesmo tempo já removeu
+    return _maybe_compact(df, compact, drop_text)
+
+
+def _maybe_compact(df, compact, drop_text):
+    if not compact:
+        return df
+    df, report = compact_dataframe(df, drop_text)
+    print_memory_report(report)
+    return df
+
+
+# --- REPRESENTAÇÃO COMPACTA ---
+
+# Colunas de texto que as análises não usam, descartáveis com `drop_text`
+UNUSED_TEXT_COLUMNS = ("pr_url", "titulo")
+
+# Strings viram categoria quando têm no máximo esta fração de valores distintos
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+# Folga da largura inteira escolhida: somas de até tantas colunas não estouram
+# (ex.: num_participantes + num_comentarios em analise.py)
+INT_HEADROOM = 4
+
+_INT_WIDTHS = ("int8", "int16", "int32", "int64")
+
+
+def _smallest_int_dtype(column):
+    import numpy as np
+
+    low, high = int(column.min()), int(column.max())
+    for dtype in _INT_WIDTHS:
+        info = np.iinfo(dtype)
+        if info.min <= low * INT_HEADROOM and high * INT_HEADROOM <= info.max:
+            return dtype
+    return "int64"
+
+
+def compact_dataframe(df, drop_text=False):
+    """
+    Versão compacta do DataFrame de PRs: strings de baixa cardinalidade
+    (repositorio, autor, estado) viram categoria e cada coluna inteira usa a
+    menor largura que comporta seus valores (com folga de INT_HEADROOM); com
+    `drop_text`, pr_url e titulo são descartados. Colunas float e datas ficam
+    como estão, para não mudar nenhum resultado das análises.
+
+    Returns:
+        tuple: (DataFrame compacto, relatório por coluna com bytes antes/depois)
+    """
+    import pandas as pd
+
+    before = df.memory_usage(deep=True, index=False)
+    compact = df.drop(columns=[c for c in UNUSED_TEXT_COLUMNS if c in df.columns]) if drop_text else df.copy()
+    for name in compact.columns:
+        column = compact[name]
+        if pd.api.types.is_integer_dtype(column) and len(column):
+            compact[name] = column.astype(_smallest_int_dtype(column))
+        elif (pd.api.types.is_object_dtype(column) or pd.api.types.is_string_dtype(column)) and len(column):
+            if column.nunique(dropna=False) <= CATEGORY_MAX_UNIQUE_RATIO * len(column):
+                compact[name] = column.astype("category")
+    after = compact.memory_usage(deep=True, index=False)
+
+    report = pd.DataFrame({
+        "antes_bytes": before,
+        "depois_bytes": after.reindex(before.index, fill_value=0),
+        "tipo": [str(compact[name].dtype) if name in compact.columns else "descartada" for name in before.index],
+    })
+    report["economia_bytes"] = report["antes_bytes"] - report["depois_bytes"]
+    return compact, report
+
+
+def print_memory_report(report):
+    total_before, total_after = report["antes_bytes"].sum(), report["depois_bytes"].sum()
+    print(f"{'coluna':<30}{'tipo':>16}{'antes (MB)':>13}{'depois (MB)':>13}{'economia':>10}")
+    for name, row in report.iterrows():
+        saved = row["economia_bytes"] / row["antes_bytes"] if row["antes_bytes"] else 0.0
+        print(f"{name:<30}{row['tipo']:>16}{row['antes_bytes'] / 2**20:>13.2f}"
+              f"{row['depois_bytes'] / 2**20:>13.2f}{saved:>10.0%}")
+    print(f"{'total':<30}{'':>16}{total_before / 2**20:>13.2f}{total_after / 2**20:>13.2f}"
+          f"{1 - total_after / total_before if total_before else 0.0:>10.0%}")
+
+
+def parse_args():
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Mostra quanta memória a representação compacta do conjunto de PRs economiza, por coluna.")
+    parser.add_argument("--sem-texto", action="store_true",
+                        help=f"Descarta também as colunas de texto não usadas ({', '.join(UNUSED_TEXT_COLUMNS)}).")
+    parser.add_argument("--verificar-parquet", action="store_true",
+                        help="Só verifica se gravar e ler o Parquet preserva os registros (dados sintéticos, "
+                             f"ou '{DATASET_JSON_FILE}' se existir). Requer pyarrow.")
+    return parser.parse_args()
+
+
+def verify_parquet():
+    import sys
+    import tempfile
+
+    if pa is None:
+        print("pyarrow não está instalado: verificação do Parquet pulada.")
+        return
+    if os.path.exists(DATASET_JSON_FILE):
+        with open(DATASET_JSON_FILE, "r", encoding="utf-8") as f:
+            records, source = json.load(f), DATASET_JSON_FILE
+    else:
+        records, source = _sample_records(), "dados sintéticos"
+    with tempfile.TemporaryDirectory() as workdir:
+        differences = parquet_round_trip_differences(records, os.path.join(workdir, "verificacao.parquet"))
+    if differences:
+        print(f"❌ Parquet não preserva {len(differences)} valor(es) de {source}:")
+        print("\n".join(f"   {difference}" for difference in differences[:20]))
+        sys.exit(1)
+    print(f"✓ Parquet preserva os {len(records)} registros de {source}.")
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.verificar_parquet:
+        verify_parquet()
+    else:
+        _, memory_report = compact_dataframe(load_prepared_dataframe(compact=False), args.sem_texto)
+        print_memory_report(memory_report)
@@ -0,0 +1,231 @@
+import argparse
+import json
+import os
+import threading
+from datetime import datetime
+
+from delta_sync import pr_key
+from jsonl_sink import read_jsonl
+from pr_store import PRStore
+
+# Log do índice: cada linha é a versão mais recente de um PR no momento em que mudou
+DEFAULT_INDEX_FILE = os.environ.get("GITHUB_PR_INDEX", "indice_prs.jsonl")
+
+# O log é compactado quando tem mais que este múltiplo de linhas por PR indexado
+COMPACT_RATIO = 2
+
+
+def _days_between(start, end):
+    created_at = datetime.fromisoformat(start.replace('Z', '+00:00'))
+    closed_at = datetime.fromisoformat(end.replace('Z', '+00:00'))
+    return round((closed_at - created_at).total_seconds() / 86400, 2)
+
+
+def record_from_repository_node(node, repo_full_name):
+    """
+    Converte um PR de rrr.json / repo_details.json (query de getRepos.py) no
+    formato de registro de dados_pull_requests3.json. Campos que essa query
+    não traz (descrição, participantes, threads de revisão) ficam None e não
+    sobrescrevem valores já indexados.
+    """
+    return {
+        'repositorio': repo_full_name,
+        'pr_number': node['number'],
+        'pr_url': node['url'],
+        'titulo': node['title'],
+        'autor': (node.get('author') or {}).get('login', 'N/A'),
+        'estado': node['state'],
+        'data_criacao': node['createdAt'],
+        'data_fechamento': node['closedAt'],
+        'tempo_analise_dias': _days_between(node['createdAt'], node['closedAt']),
+        'num_arquivos_alterados': node['changedFiles'],
+        'linhas_adicionadas': node['additions'],
+        'linhas_removidas': node['deletions'],
+        'tamanho_descricao_caracteres': None,
+        'num_participantes': None,
+        # Em dados_pull_requests3.json os comentários incluem as threads de revisão
+        'num_comentarios': None,
+        'num_revisoes': node['reviews']['totalCount'],
+    }
+
+
+def records_from_repository(repo_data):
+    """
+    Registros dos PRs de um repositório no formato de getRepos.py (`pullRequests.nodes`).
+
+    Só entram PRs fechados com ao menos uma revisão, a mesma população da
+    busca `reviews:>=1` de getReposDetails.py; os demais não se misturam ao
+    índice nem ao banco.
+    """
+    nodes = (repo_data.get('pullRequests') or {}).get('nodes') or []
+    records = [record_from_repository_node(node, repo_data['nameWithOwner'])
+               for node in nodes if node and node.get('closedAt')]
+    return [record for record in records if record['num_revisoes'] >= 1]
+
+
+def load_collection_output(path):
+    """
+    Lê a saída de qualquer coletor como registros de PR: registros de
+    dados_pull_requests3.json(l) ou repositórios de rrr.json / repo_details.json
+    (um objeto, uma lista ou um por linha).
+    """
+    if path.endswith('.jsonl'):
+        items = list(read_jsonl(path))
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        try:
+            items = json.loads(text)
+        except json.JSONDecodeError:
+            # repo_details.json é gravado em JSON Lines apesar da extensão
+            items = [json.loads(line) for line in text.splitlines() if line.strip()]
+    if isinstance(items, dict):
+        items = [items]
+
+    records = []
+    for item in items:
+        if 'repositorio' in item:
+            records.append(item)
+        else:
+            records.extend(records_from_repository(item))
+    return records
+
+
+class PRIndex:
+    """
+    Índice persistente de PRs por (repositorio, pr_number), compartilhado por
+    todos os coletores: em memória é um dict (busca e deduplicação O(1)) e em
+    disco um log JSON Lines só de anexação, reproduzido no carregamento (a
+    última linha de cada PR vence).
+
+    Um PR já indexado é atualizado no lugar, campo a campo: só valores não
+    nulos que mudaram são aplicados, de modo que uma fonte com menos campos
+    (getRepos.py) não apaga o que outra (getReposDetails.py) já trouxe. PRs
+    sem mudança não geram linha nova no log.
+
+    Com `store` (ver pr_store.py), os PRs novos ou alterados também são
+    gravados no banco SQLite usado pelas consultas das análises.
+    """
+
+    def __init__(self, path=DEFAULT_INDEX_FILE, store=None):
+        self.path = path
+        self.store = store
+        self._records = None  # chave -> registro, carregado no primeiro uso
+        self._log_lines = 0
+        self._lock = threading.Lock()
+
+    def _load_locked(self):
+        if self._records is None:
+            self._records = {}
+            if os.path.exists(self.path):
+                for record in read_jsonl(self.path):
+                    self._records[pr_key(record)] = record
+                    self._log_lines += 1
+        return self._records
+
+    def __len__(self):
+        with self._lock:
+            return len(self._load_locked())
+
+    def __contains__(self, key):
+        with self._lock:
+            return tuple(key) in self._load_locked()
+
+    def get(self, repo, pr_number):
+        with self._lock:
+            return self._load_locked().get((repo, pr_number))
+
+    def records(self):
+        """Todos os PRs indexados, cada um uma única vez."""
+        with self._lock:
+            return list(self._load_locked().values())
+
+    def upsert(self, records):
+        """
+        Insere ou atualiza os registros e anexa ao log os que mudaram.
+
+        Returns:
+            tuple: (quantidade inserida, quantidade atualizada, quantidade sem mudança)
+        """
+        inserted = updated = unchanged = 0
+        with self._lock:
+            index = self._load_locked()
+            changed = []
+            for record in records:
+                key = pr_key(record)
+                current = index.get(key)
+                if current is None:
+                    current = index[key] = dict(record)
+                    inserted += 1
+                    changed.append(current)
+                    continue
+                differences = {field: value for field, value in record.items()
+                               if value is not None and current.get(field) != value}
+                if differences:
+                    current.update(differences)
+                    updated += 1
+                    changed.append(current)
+                else:
+                    unchanged += 1
+
+            if changed:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.writelines(json.dumps(record, ensure_ascii=False) + '\n' for record in changed)
+                self._log_lines += len(changed)
+                if self.store is not None:
+                    self.store.upsert(changed)
+            if self._log_lines > COMPACT_RATIO * len(index):
+                self._compact_locked()
+        return inserted, updated, unchanged
+
+    def compact(self):
+        """Regrava o log (atomicamente) com uma linha por PR."""
+        with self._lock:
+            self._load_locked()
+            self._compact_locked()
+
+    def _compact_locked(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(record, ensure_ascii=False) + '\n' for record in self._records.values())
+        os.replace(tmp_path, self.path)
+        self._log_lines = len(self._records)
+
+
+def open_default_index():
+    """
+    Índice padrão (DEFAULT_INDEX_FILE), espelhado no banco SQLite: o que os
+    coletores alimentam quando rodam com --indexar. Ele mantém em memória
+    todos os PRs indexados, então fica fora das coletas que não o pedem.
+    """
+    return PRIndex(store=PRStore())
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Unifica as saídas dos coletores no índice global de PRs, sem duplicatas.")
+    parser.add_argument("--importar", nargs="+", default=[], metavar="ARQUIVO",
+                        help="Saídas a indexar (rrr.json, repo_details.json, dados_pull_requests3.json ...).")
+    parser.add_argument("--exportar", metavar="ARQUIVO",
+                        help="Grava todos os PRs indexados, um por registro, neste arquivo JSON.")
+    parser.add_argument("--indice", default=DEFAULT_INDEX_FILE, help="Arquivo de log do índice.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    index = PRIndex(args.indice, store=PRStore())
+    for path in args.importar:
+        inserted, updated, unchanged = index.upsert(load_collection_output(path))
+        print(f"'{path}': {inserted} PR(s) novo(s), {updated} atualizado(s), {unchanged} sem mudança.")
+    index.compact()
+    print(f"Índice '{args.indice}': {len(index)} PRs únicos.")
+
+    if args.exportar:
+        with open(args.exportar, 'w', encoding='utf-8') as f:
+            json.dump(index.records(), f, ensure_ascii=False, indent=4)
+        print(f"PRs exportados para '{args.exportar}'.")
+
+
+if __name__ == "__main__":
+    main()
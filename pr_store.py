@@ -0,0 +1,175 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+
+from page_normalizer import PR_FIELDS
+
+DEFAULT_DB_FILE = os.environ.get("GITHUB_PR_DB", "dados_pull_requests.sqlite")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS prs (
+    repositorio TEXT NOT NULL,
+    pr_number INTEGER NOT NULL,
+    pr_url TEXT,
+    titulo TEXT,
+    autor TEXT,
+    estado TEXT,
+    data_criacao TEXT,
+    data_fechamento TEXT,
+    tempo_analise_dias REAL,
+    num_arquivos_alterados INTEGER,
+    linhas_adicionadas INTEGER,
+    linhas_removidas INTEGER,
+    tamanho_descricao_caracteres INTEGER,
+    num_participantes INTEGER,
+    num_comentarios INTEGER,
+    num_revisoes INTEGER,
+    PRIMARY KEY (repositorio, pr_number)
+);
+CREATE INDEX IF NOT EXISTS idx_prs_repositorio_criacao ON prs (repositorio, data_criacao);
+CREATE INDEX IF NOT EXISTS idx_prs_estado ON prs (estado);
+CREATE INDEX IF NOT EXISTS idx_prs_data_criacao ON prs (data_criacao);
+CREATE INDEX IF NOT EXISTS idx_prs_autor ON prs (autor);
+"""
+
+# Como no índice global (pr_index.py), valores nulos não apagam os já gravados
+_UPSERT = "INSERT INTO prs ({columns}) VALUES ({placeholders}) ON CONFLICT (repositorio, pr_number) DO UPDATE SET {updates}".format(
+    columns=", ".join(PR_FIELDS),
+    placeholders=", ".join("?" * len(PR_FIELDS)),
+    updates=", ".join(f"{field} = COALESCE(excluded.{field}, prs.{field})"
+                      for field in PR_FIELDS if field not in ("repositorio", "pr_number")),
+)
+
+
+class PRStore:
+    """
+    Banco SQLite dos PRs coletados, com a mesma chave (repositorio, pr_number)
+    e índices em repositorio, estado, data_criacao e autor, para responder
+    perguntas seletivas sem carregar o conjunto de dados inteiro. É preenchido
+    por `--importar` ou pelos coletores com --indexar e consultado pela linha
+    de comando deste módulo; as análises continuam lendo o conjunto completo
+    (ver pr_dataset.py).
+
+    As datas ficam como texto ISO 8601 em UTC, que ordena e compara como
+    data (ex.: `data_criacao >= '2023-01'`, `substr(data_criacao, 1, 7)`).
+    A conexão é aberta no primeiro uso e compartilhada entre threads.
+    """
+
+    def __init__(self, path=DEFAULT_DB_FILE):
+        self.path = path
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _connect_locked(self):
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.row_factory = sqlite3.Row
+            self._connection.execute("PRAGMA journal_mode=WAL")  # Leitores não esperam a coleta
+            self._connection.executescript(_SCHEMA)
+        return self._connection
+
+    def upsert(self, records):
+        """Insere ou atualiza os registros numa única transação."""
+        rows = [tuple(record.get(field) for field in PR_FIELDS) for record in records]
+        if not rows:
+            return
+        with self._lock:
+            connection = self._connect_locked()
+            with connection:
+                connection.executemany(_UPSERT, rows)
+
+    def query(self, sql, params=()):
+        """Resultado de uma consulta como lista de dicts."""
+        with self._lock:
+            rows = self._connect_locked().execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def count(self):
+        return self.query("SELECT COUNT(*) AS total FROM prs")[0]["total"]
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    # --- Perguntas frequentes das análises ---
+
+    def acceptance_rate_by_month(self, repo):
+        """Taxa de PRs mesclados por mês de criação, de um repositório."""
+        return self.query(
+            "SELECT substr(data_criacao, 1, 7) AS ano_mes, COUNT(*) AS prs, "
+            "AVG(estado = 'MERGED') AS taxa_aceitacao "
+            "FROM prs WHERE repositorio = ? GROUP BY ano_mes ORDER BY ano_mes",
+            (repo,))
+
+    def median(self, column, where=("1", ())):
+        """
+        Mediana de `column` entre os PRs que satisfazem `where`, um par
+        (condição SQL com `?`, parâmetros); os valores nunca entram no texto
+        da consulta. Só essa coluna é lida.
+        """
+        if column not in PR_FIELDS:
+            raise ValueError(f"Coluna desconhecida: {column}")
+        condition, params = where
+        values = [row[column] for row in self.query(
+            f"SELECT {column} FROM prs WHERE ({condition}) AND {column} IS NOT NULL ORDER BY {column}",
+            tuple(params))]
+        if not values:
+            return None
+        middle = len(values) // 2
+        return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Banco SQLite dos PRs coletados, para consultas seletivas.")
+    parser.add_argument("--banco", default=DEFAULT_DB_FILE, help="Arquivo do banco.")
+    parser.add_argument("--importar", nargs="+", default=[], metavar="ARQUIVO",
+                        help="Saídas dos coletores a carregar no banco (mesclando por repositorio/pr_number).")
+    parser.add_argument("--sql", help="Consulta a executar (o resultado é impresso).")
+    parser.add_argument("--taxa-aceitacao", metavar="REPOSITORIO",
+                        help="Imprime a taxa de PRs mesclados por mês de criação do repositório.")
+    parser.add_argument("--mediana", choices=PR_FIELDS, metavar="COLUNA",
+                        help="Imprime a mediana da coluna (por estado do PR).")
+    parser.add_argument("--repositorio", help="Restringe --mediana a um repositório.")
+    return parser.parse_args()
+
+
+def main():
+    from pr_index import load_collection_output
+
+    args = parse_args()
+    store = PRStore(args.banco)
+    for path in args.importar:
+        records = load_collection_output(path)
+        store.upsert(records)
+        print(f"'{path}': {len(records)} PR(s) carregado(s).")
+    if args.importar:
+        print(f"Banco '{args.banco}': {store.count()} PRs.")
+
+    if args.sql:
+        start = time.perf_counter()
+        rows = store.query(args.sql)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        for row in rows:
+            print(row)
+        print(f"{len(rows)} linha(s) em {elapsed_ms:.1f} ms.")
+
+    if args.taxa_aceitacao:
+        for row in store.acceptance_rate_by_month(args.taxa_aceitacao):
+            print(f"{row['ano_mes']}: {row['prs']} PR(s), {row['taxa_aceitacao']:.1%} mesclado(s)")
+
+    if args.mediana:
+        for state in ("MERGED", "CLOSED"):
+            condition, params = "estado = ?", [state]
+            if args.repositorio:
+                condition += " AND repositorio = ?"
+                params.append(args.repositorio)
+            print(f"Mediana de {args.mediana} ({state}): {store.median(args.mediana, (condition, params))}")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import threading
+import time
+from datetime import datetime
+
+# Campo pedido em toda query para acompanhar o orçamento de pontos da API GraphQL.
+RATE_LIMIT_FIELDS = "rateLimit { cost remaining resetAt }"
+
+# Folga (em segundos) somada ao resetAt antes de voltar a consumir o orçamento.
+RESET_MARGIN_SECONDS = 1
+
+# Orçamento horário de um token, assumido enquanto a API não informa o saldo real.
+HOURLY_BUDGET = 5000
+
+# Espera (em segundos) quando o saldo zera sem que a API informe o horário do reset.
+UNKNOWN_RESET_WAIT_SECONDS = 60
+
+
+def _operation_closing_brace(query):
+    """Posição da chave que fecha a primeira operação do documento (ignora strings e comentários)."""
+    depth = 0
+    in_string = in_comment = escaped = False
+    for position, char in enumerate(query):
+        if in_comment:
+            in_comment = char != "\n"
+        elif in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == "#":
+            in_comment = True
+        elif char == '"':
+            in_string = True
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return position
+    raise ValueError("Query GraphQL sem bloco de seleção balanceado.")
+
+
+def with_rate_limit(query):
+    """
+    Devolve a query com o campo `rateLimit` inserido no nível raiz da operação
+    (antes da chave que fecha a operação, preservando fragmentos seguintes).
+    """
+    if "rateLimit" in query:
+        return query
+    closing_brace = _operation_closing_brace(query)
+    return f"{query[:closing_brace]}  {RATE_LIMIT_FIELDS}\n{query[closing_brace:]}"
+
+
+def _parse_reset_at(reset_at):
+    return datetime.fromisoformat(reset_at.replace("Z", "+00:00")).timestamp()
+
+
+class RateLimitScheduler:
+    """
+    Agendador compartilhado pelos coletores. Em vez de pausas fixas entre
+    requisições, gasta o orçamento horário o mais rápido possível e só dorme
+    até `resetAt` quando os pontos restantes não cobrem a próxima query.
+    """
+
+    def __init__(self, default_cost=1):
+        self._lock = threading.Lock()
+        self.default_cost = default_cost
+        self.remaining = None   # Desconhecido até a primeira resposta
+        self.reset_at = None    # Epoch (segundos) em que o orçamento é renovado
+        self.points_spent = 0
+        self._costs = {}        # Último custo observado por texto de query
+
+    def expected_cost(self, query):
+        return self._costs.get(query, self.default_cost)
+
+    def headroom(self):
+        """Pontos que ainda podem ser gastos agora (orçamento cheio se desconhecido ou já renovado)."""
+        with self._lock:
+            if self.remaining is None or (self.reset_at is not None and time.time() >= self.reset_at):
+                return HOURLY_BUDGET
+            return self.remaining
+
+    def wait_for_budget(self, query=None):
+        """Bloqueia até haver orçamento para `query` e reserva o custo esperado."""
+        cost = self.expected_cost(query)
+        while True:
+            with self._lock:
+                if self.remaining is None or self.remaining >= cost:
+                    if self.remaining is not None:
+                        self.remaining -= cost
+                    return
+                if self.reset_at is None:
+                    self.reset_at = time.time() + UNKNOWN_RESET_WAIT_SECONDS
+                wait_seconds = self.reset_at - time.time() + RESET_MARGIN_SECONDS
+                if wait_seconds <= 0:
+                    # O orçamento já foi renovado; a próxima resposta informa o novo saldo.
+                    self.remaining = None
+                    continue
+
+            print(f"⏳ Orçamento da API esgotado ({self.remaining} pontos). Aguardando {wait_seconds:.0f}s até o reset...")
+            time.sleep(wait_seconds)
+
+    def update(self, result, query=None):
+        """Atualiza o saldo a partir do campo `rateLimit` de uma resposta GraphQL."""
+        rate_limit = ((result or {}).get("data") or {}).get("rateLimit")
+        if not rate_limit:
+            return
+        with self._lock:
+            self.remaining = rate_limit["remaining"]
+            self.reset_at = _parse_reset_at(rate_limit["resetAt"])
+            self.points_spent += rate_limit["cost"]
+            if query is not None:
+                self._costs[query] = rate_limit["cost"]
+
+    def update_from_headers(self, headers):
+        """Atualiza o saldo a partir dos cabeçalhos X-RateLimit-* (ex.: respostas 403)."""
+        if "X-RateLimit-Remaining" not in headers:
+            return
+        with self._lock:
+            self.remaining = int(headers["X-RateLimit-Remaining"])
+            if "X-RateLimit-Reset" in headers:
+                self.reset_at = int(headers["X-RateLimit-Reset"])
+            elif self.reset_at is None or time.time() >= self.reset_at:
+                # Sem o horário do reset, espera um intervalo fixo em vez de
+                # considerar o orçamento renovado na hora.
+                self.reset_at = time.time() + UNKNOWN_RESET_WAIT_SECONDS
+
+
+class TokenPool:
+    """
+    Conjunto de tokens do GitHub, cada um com seu próprio agendador (saldo e
+    resetAt). Cada requisição vai para o token com mais folga; quando nenhum
+    cobre a query, espera-se pelo token renovado primeiro. Tokens revogados
+    (401) são descartados com `drop` e os demais seguem atendendo.
+    """
+
+    def __init__(self, tokens, schedulers=None):
+        self._lock = threading.Lock()
+        self.tokens = list(dict.fromkeys(tokens))
+        self.schedulers = dict(schedulers or {})
+        for token in self.tokens:
+            self.schedulers.setdefault(token, RateLimitScheduler())
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def acquire(self, query=None):
+        """Escolhe o token da próxima requisição e reserva nele o custo esperado."""
+        with self._lock:
+            if not self.tokens:
+                return None
+            candidates = [(self.schedulers[token], token) for token in self.tokens]
+        cost = candidates[0][0].expected_cost(query)
+        affordable = [(sched.headroom(), token) for sched, token in candidates if sched.headroom() >= cost]
+        if affordable:
+            token = max(affordable)[1]
+        else:
+            # Nenhum token tem saldo: espera pelo que renova primeiro.
+            token = min(candidates, key=lambda pair: pair[0].reset_at or 0)[1]
+        self.schedulers[token].wait_for_budget(query)
+        return token
+
+    def update(self, token, result, query=None):
+        self.schedulers[token].update(result, query)
+
+    def update_from_headers(self, token, headers):
+        self.schedulers[token].update_from_headers(headers)
+
+    def drop(self, token):
+        """Remove um token inválido; devolve False se outra thread já o removeu."""
+        with self._lock:
+            if token not in self.tokens:
+                return False
+            self.tokens.remove(token)
+            return True
+
+
+# Instância única compartilhada por todos os coletores do processo.
+scheduler = RateLimitScheduler()
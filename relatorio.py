@@ -1,75 +1,17 @@
 import pandas as pd
 import numpy as np
 from scipy import stats
-from scipy.stats import spearmanr, pearsonr
 from sklearn.linear_model import LinearRegression
 from sklearn.metrics import r2_score
-import json
+from pr_dataset import load_prepared_dataframe
+from correlation import analise_correlacao_completa, rank_cache_for
 from datetime import datetime
 
 # ============================================
 # CARREGAR DADOS
 # ============================================
 
-with open('dados_pull_requests3.json', 'r', encoding='utf-8') as file:
-  dados_json = json.load(file)
-
-df = pd.DataFrame(dados_json)
-
-# Preparar dados
-df['data_criacao'] = pd.to_datetime(df['data_criacao'])
-df['data_fechamento'] = pd.to_datetime(df['data_fechamento'])
-df['tamanho_total_linhas'] = df['linhas_adicionadas'] + df['linhas_removidas']
-df['estado_numerico'] = (df['estado'] == 'MERGED').astype(int)
-
-# ============================================
-# FUNÇÃO DE ANÁLISE COMPLETA
-# ============================================
-
-def analise_correlacao_completa(var1_name, var2_name, dados):
-  var1 = dados[var1_name]
-  var2 = dados[var2_name]
-  
-  rho, p_spearman = spearmanr(var1, var2)
-  r, p_pearson = pearsonr(var1, var2)
-  
-  abs_rho = abs(rho)
-  if abs_rho < 0.1:
-      forca = "Trivial"
-  elif abs_rho < 0.3:
-      forca = "Fraca"
-  elif abs_rho < 0.5:
-      forca = "Moderada"
-  elif abs_rho < 0.7:
-      forca = "Forte"
-  else:
-      forca = "Muito Forte"
-  
-  direcao = "Positiva" if rho > 0 else "Negativa"
-  
-  if p_spearman < 0.001:
-      sig = "***"
-      sig_text = "Altamente significativa"
-  elif p_spearman < 0.01:
-      sig = "**"
-      sig_text = "Muito significativa"
-  elif p_spearman < 0.05:
-      sig = "*"
-      sig_text = "Significativa"
-  else:
-      sig = "ns"
-      sig_text = "Não significativa"
-  
-  return {
-      'spearman_rho': rho,
-      'spearman_p': p_spearman,
-      'pearson_r': r,
-      'pearson_p': p_pearson,
-      'forca': forca,
-      'direcao': direcao,
-      'significancia': sig,
-      'sig_text': sig_text
-  }
+df = load_prepared_dataframe()  # Já com as colunas derivadas, em cache (ver pr_dataset.py)
 
 # ============================================
 # REALIZAR TODAS AS ANÁLISES
@@ -93,9 +35,12 @@ respostas_rq['RQ08_comentarios'] = analise_correlacao_completa('num_comentarios'
 
 # Testes Mann-Whitney U para grupos
 def teste_mann_whitney(var, df):
-  merged = df[df['estado'] == 'MERGED'][var]
-  closed = df[df['estado'] == 'CLOSED'][var]
-  u_stat, p_val = stats.mannwhitneyu(merged, closed, alternative='two-sided')
+  merged_mask = (df['estado'] == 'MERGED').to_numpy()
+  closed_mask = (df['estado'] == 'CLOSED').to_numpy()
+  merged = df.loc[merged_mask, var]
+  closed = df.loc[closed_mask, var]
+  # Mesmos ranks já calculados para as correlações das RQs
+  u_stat, p_val = rank_cache_for(df).mann_whitney(var, merged_mask, closed_mask)
   
   z_score = abs(stats.norm.ppf(p_val / 2)) if p_val > 0 else 0
   effect_size = z_score / np.sqrt(len(df)) if z_score > 0 else 0
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+# Diretório padrão do cache, compartilhado por todos os coletores
+DEFAULT_CACHE_DIR = os.environ.get("GITHUB_CACHE_DIR", ".cache_graphql")
+
+# Validade padrão de uma resposta (segundos), para queries sem TTL próprio
+DEFAULT_TTL_SECONDS = 24 * 3600
+
+# Tamanho máximo do cache em disco; acima disso as entradas menos usadas são removidas
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+_OPERATION_NAME = re.compile(r"^\s*query\s+(\w+)")
+
+
+def operation_name(query):
+    match = _OPERATION_NAME.match(query)
+    return match.group(1) if match else None
+
+
+def cache_key(query, variables=None):
+    """Endereço de conteúdo de uma requisição: hash do texto da query e das variáveis."""
+    payload = json.dumps({"query": query, "variables": variables or {}}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Cache em disco das respostas GraphQL, endereçado pelo conteúdo da
+    requisição (ver `cache_key`). Cada resposta vale pelo TTL da sua query
+    (`ttls`, por nome da operação) e, quando o diretório passa de `max_bytes`,
+    as entradas usadas há mais tempo são removidas (LRU pela data de modificação,
+    renovada a cada acerto).
+
+    Com `bypass`, as leituras são ignoradas mas as respostas novas continuam
+    sendo gravadas, renovando o cache.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, ttls=None, default_ttl=DEFAULT_TTL_SECONDS,
+                 max_bytes=DEFAULT_MAX_BYTES, bypass=False):
+        self.directory = directory
+        self.ttls = dict(ttls or {})
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._index = None  # caminho -> tamanho, carregado no primeiro uso
+        self._total_bytes = 0  # Soma dos tamanhos em `_index`
+
+    def ttl_for(self, query):
+        return self.ttls.get(operation_name(query), self.default_ttl)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, query, variables=None):
+        """Resposta guardada para a requisição, ou None (ausente, expirada ou bypass)."""
+        if self.bypass:
+            return None
+        path = self._path(cache_key(query, variables))
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        if time.time() - entry["stored_at"] > self.ttl_for(query):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        try:
+            os.utime(path)  # Marca o uso recente para a remoção LRU
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return entry["response"]
+
+    def put(self, query, variables, response):
+        """Guarda uma resposta bem-sucedida e aplica o limite de tamanho."""
+        path = self._path(cache_key(query, variables))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"stored_at": time.time(), "response": response}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            index = self._load_index()
+            size = os.path.getsize(path)
+            self._total_bytes += size - index.get(path, 0)
+            index[path] = size
+            if self._total_bytes > self.max_bytes:
+                self._evict(index)
+
+    def _load_index(self):
+        if self._index is None:
+            self._index = {}
+            if os.path.isdir(self.directory):
+                for shard in os.scandir(self.directory):
+                    if not shard.is_dir():
+                        continue
+                    for entry in os.scandir(shard.path):
+                        if entry.name.endswith(".json"):
+                            self._index[entry.path] = entry.stat().st_size
+            self._total_bytes = sum(self._index.values())
+        return self._index
+
+    def _evict(self, index):
+        """Remove as entradas menos usadas até o cache voltar a caber em `max_bytes`."""
+        by_last_use = []
+        for path in index:
+            try:
+                by_last_use.append((os.path.getmtime(path), path))
+            except FileNotFoundError:
+                by_last_use.append((0, path))
+        by_last_use.sort()
+
+        # Recalculado aqui, para não acumular desvios do total mantido em `put`
+        self._total_bytes = sum(index.values())
+        for _, path in by_last_use:
+            if self._total_bytes <= self.max_bytes:
+                break
+            self._total_bytes -= index.pop(path)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta, timezone
+
+# A busca do GitHub devolve no máximo 1000 resultados por query, mesmo paginando.
+SEARCH_RESULT_CAP = 1000
+
+# Nenhum PR pode ter sido criado antes do lançamento do GitHub.
+GITHUB_LAUNCH = datetime(2007, 10, 1, tzinfo=timezone.utc)
+
+ONE_SECOND = timedelta(seconds=1)
+
+
+def format_timestamp(moment):
+    return moment.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def window_query(base_query, start, end):
+    """Restringe `base_query` aos itens criados entre `start` e `end` (inclusive)."""
+    return f"{base_query} created:{format_timestamp(start)}..{format_timestamp(end)}"
+
+
+def plan_windows(base_query, count_queries, start=GITHUB_LAUNCH, end=None, cap=SEARCH_RESULT_CAP):
+    """
+    Divide `base_query` em janelas de `created:` com no máximo `cap` resultados
+    cada, bissectando recursivamente as janelas que passam do limite.
+
+    As janelas de um mesmo nível da bissecção são contadas juntas numa única
+    chamada a `count_queries`, que recebe uma lista de strings de busca e
+    devolve a lista de `issueCount` correspondente (None = falha na contagem).
+
+    Returns:
+        list: Tuplas (start, end, issueCount) em ordem cronológica, sem janelas vazias.
+    """
+    if end is None:
+        end = datetime.now(timezone.utc).replace(microsecond=0)
+
+    pending = [(start, end)]
+    planned = []
+    while pending:
+        counts = count_queries([window_query(base_query, s, e) for s, e in pending])
+        next_level = []
+        for (s, e), count in zip(pending, counts):
+            if count == 0:
+                continue
+            if count is None:
+                print(f"  ⚠️ Falha ao contar a janela {format_timestamp(s)}..{format_timestamp(e)}. Ela será coletada sem divisão.")
+                planned.append((s, e, None))
+            elif count <= cap:
+                planned.append((s, e, count))
+            elif e - s < ONE_SECOND:
+                print(f"  ⚠️ Janela de 1 segundo com {count} resultados em '{base_query}'. Apenas {cap} serão coletados.")
+                planned.append((s, e, count))
+            else:
+                middle = s + (e - s) // 2
+                middle = middle.replace(microsecond=0)
+                next_level += [(s, middle), (middle + ONE_SECOND, e)]
+        pending = next_level
+
+    return sorted(planned)
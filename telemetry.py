@@ -0,0 +1,165 @@
+import atexit
+import json
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+
+# Limites (segundos) dos baldes do histograma de latência
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Intervalo padrão entre gravações do arquivo de telemetria
+DEFAULT_FLUSH_SECONDS = 30
+
+
+class _Histogram:
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # Último balde: +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        position = next((i for i, bound in enumerate(LATENCY_BUCKETS) if seconds <= bound), len(LATENCY_BUCKETS))
+        self.buckets[position] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def cumulative(self):
+        """Contagens acumuladas por limite superior, como no formato do Prometheus."""
+        total, pairs = 0, []
+        for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), self.buckets):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+
+class Telemetry:
+    """
+    Métricas de uma coleta: histograma de latência por operação GraphQL,
+    retentativas por causa ('502', 'timeout', 'connection', '403', 'graphql'),
+    pontos de rate limit gastos e PRs/s por repositório.
+
+    As métricas são sempre agregadas em memória; com `configure`, também são
+    gravadas periodicamente num arquivo JSON ou no formato texto do Prometheus
+    (extensão .prom), e uma última vez ao final do processo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.path = None
+        self.flush_seconds = DEFAULT_FLUSH_SECONDS
+        self.started_at = time.time()
+        self._last_flush = time.monotonic()
+        self.latency = defaultdict(_Histogram)
+        self.status = Counter()
+        self.retries = Counter()
+        self.points_spent = 0
+        self.repo_prs = Counter()
+        self.repo_started = {}
+        self.repo_updated = {}
+
+    def configure(self, path, flush_seconds=DEFAULT_FLUSH_SECONDS):
+        self.path = path
+        self.flush_seconds = flush_seconds
+        atexit.register(self.flush)
+
+    def observe_request(self, operation, seconds, status):
+        with self._lock:
+            self.latency[operation or "anonima"].observe(seconds)
+            self.status[str(status)] += 1
+        self._maybe_flush()
+
+    def count_retry(self, cause):
+        with self._lock:
+            self.retries[cause] += 1
+
+    def add_points(self, cost):
+        with self._lock:
+            self.points_spent += cost
+
+    def start_repo(self, repo):
+        """Marca o início da coleta de um repositório (chamadas repetidas são ignoradas)."""
+        with self._lock:
+            self.repo_started.setdefault(repo, time.monotonic())
+
+    def record_prs(self, repo, count):
+        with self._lock:
+            now = time.monotonic()
+            self.repo_started.setdefault(repo, now)
+            self.repo_prs[repo] += count
+            self.repo_updated[repo] = now
+        self._maybe_flush()
+
+    def _prs_per_second(self, repo):
+        elapsed = self.repo_updated.get(repo, 0) - self.repo_started.get(repo, 0)
+        return self.repo_prs[repo] / elapsed if elapsed > 0 else 0.0
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "gerado_em": time.time(),
+                "duracao_s": time.time() - self.started_at,
+                "requisicoes_por_status": dict(self.status),
+                "latencia_por_operacao": {
+                    operation: {
+                        "contagem": histogram.count,
+                        "soma_s": histogram.sum,
+                        "baldes": {str(bound): total for bound, total in histogram.cumulative()},
+                    }
+                    for operation, histogram in self.latency.items()
+                },
+                "retentativas_por_causa": dict(self.retries),
+                "pontos_gastos": self.points_spent,
+                "prs_por_repositorio": {
+                    repo: {"prs": self.repo_prs[repo], "prs_por_s": self._prs_per_second(repo)}
+                    for repo in self.repo_prs
+                },
+            }
+
+    def prometheus_text(self):
+        snapshot = self.snapshot()
+        lines = ["# TYPE github_request_duration_seconds histogram"]
+        for operation, histogram in snapshot["latencia_por_operacao"].items():
+            for bound, total in histogram["baldes"].items():
+                lines.append(f'github_request_duration_seconds_bucket{{operation="{operation}",le="{bound}"}} {total}')
+            lines.append(f'github_request_duration_seconds_sum{{operation="{operation}"}} {histogram["soma_s"]}')
+            lines.append(f'github_request_duration_seconds_count{{operation="{operation}"}} {histogram["contagem"]}')
+        lines.append("# TYPE github_requests_total counter")
+        lines += [f'github_requests_total{{status="{status}"}} {count}'
+                  for status, count in snapshot["requisicoes_por_status"].items()]
+        lines.append("# TYPE github_retries_total counter")
+        lines += [f'github_retries_total{{cause="{cause}"}} {count}'
+                  for cause, count in snapshot["retentativas_por_causa"].items()]
+        lines.append("# TYPE github_rate_limit_points_total counter")
+        lines.append(f"github_rate_limit_points_total {snapshot['pontos_gastos']}")
+        lines.append("# TYPE github_prs_collected_total counter")
+        lines += [f'github_prs_collected_total{{repo="{repo}"}} {progress["prs"]}'
+                  for repo, progress in snapshot["prs_por_repositorio"].items()]
+        lines.append("# TYPE github_prs_per_second gauge")
+        lines += [f'github_prs_per_second{{repo="{repo}"}} {progress["prs_por_s"]}'
+                  for repo, progress in snapshot["prs_por_repositorio"].items()]
+        return "\n".join(lines) + "\n"
+
+    def _maybe_flush(self):
+        if self.path is not None and time.monotonic() - self._last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        """Grava as métricas atuais (atomicamente) no arquivo configurado."""
+        if self.path is None:
+            return
+        with self._flush_lock:
+            self._last_flush = time.monotonic()
+            if self.path.endswith(".prom"):
+                content = self.prometheus_text()
+            else:
+                content = json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(content)
+            os.replace(tmp_path, self.path)
+
+
+# Instância única compartilhada pelo cliente e pelos coletores do processo.
+telemetry = Telemetry()